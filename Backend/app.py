@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, stream_with_context, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -6,9 +6,24 @@ import uuid
 import time
 import signal
 import atexit
+import multiprocessing
 import shutil
+import json
+import threading
 # Import RAG pipeline functions
-from utils.ragPipeline import process_with_rag_pipeline, query_with_rag, check_if_chromadb_empty, clear_chromadb
+from utils.ragPipeline import answer_query, stream_query_with_rag, check_if_chromadb_empty, clear_chromadb, drop_session_collection
+from utils.ragPipeline import answer_queries, search_chunks, build_search_filter, NO_DOCUMENTS_ANSWER
+from utils.ragPipeline import CHROMA_PERSIST, CHROMA_PATH, load_persisted_state, warm_up, readiness, get_chromadb_stats
+from utils.ragPipeline import shared_state, embedding_cache, embedding_service, answer_cache, collection_stats
+from utils.persistence import read_json
+from utils.llmClient import llm_client
+from utils.ingestJobs import submit_ingest_job, get_job, shutdown_ingest_jobs, JobQueueFull
+from utils.sessionReaper import SessionReaper
+from utils.reranker import reranker_available, RERANKER_UNAVAILABLE
+from utils.uploadStream import receive_files, UploadTooLarge, MAX_REQUEST_BYTES, MAX_FILE_BYTES, MAX_SESSION_BYTES
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.logger import get_logger, set_trace_id
+from utils.metrics import registry, span, http_requests, http_request_seconds, value_samples, latency_histogram_samples
 
 # Load .env and Groq API key
 load_dotenv()
@@ -20,15 +35,70 @@ app = Flask(__name__)
 app.secret_key = 'your-secret-key-for-sessions'  # Change this to a secure secret key
 app.permanent_session_lifetime = 3600  # Session expires after 1 hour
 CORS(app, supports_credentials=True)
+# Bodies with a larger Content-Length are refused with 413 before any of them is read
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+logger = get_logger("app")
+
+# Models load lazily on first use; WARMUP_ON_START=1 loads them in the background right after startup
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "").lower() in ("1", "true", "yes")
+
+# Most questions one /query/batch request may carry
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "256"))
+# Deepest result /search pages into (offset + limit)
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
 
 # Ensure uploaded_files directory exists
 UPLOAD_FOLDER = "uploaded_files"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Global dictionary to track uploaded files per session
-session_files = {}
-# Track session last activity
-session_last_activity = {}
+# Uploaded files and last activity per session live in shared_state (SQLite) rather than
+# module-level dicts, so every server worker process sees the same sessions
+SESSION_TIMEOUT = int(os.getenv("SESSION_TIMEOUT", "3600"))  # Seconds of inactivity before a session is cleaned up
+# Where earlier versions saved session tracking in persistent mode; migrated on startup
+LEGACY_SESSION_STATE_PATH = os.path.join(CHROMA_PATH, "sessions.json")
+
+def restore_session_state():
+    """Pick up sessions and collections left by the previous run instead of starting empty"""
+    persisted_sessions = load_persisted_state()
+    if not CHROMA_PERSIST:
+        # In-memory collections did not survive the restart, so neither do their sessions
+        shared_state.clear_sessions()
+        return
+    legacy = read_json(LEGACY_SESSION_STATE_PATH, None)
+    if legacy:
+        for session_id, files in legacy.get("session_files", {}).items():
+            for file_info in files:
+                shared_state.add_session_file(session_id, file_info)
+        for session_id, last_activity in legacy.get("session_last_activity", {}).items():
+            shared_state.touch_session(session_id, last_activity)
+        os.remove(LEGACY_SESSION_STATE_PATH)
+    # Collections without recorded activity get a fresh expiry window rather than being wiped
+    for session_id in persisted_sessions:
+        shared_state.ensure_session(session_id)
+    session_reaper.load(shared_state.session_activity())
+    print(f"💾 Restored {len(shared_state.session_activity())} sessions from {shared_state.path}")
+
+def session_upload_bytes(session_id):
+    """Bytes of uploads the session already holds, for the per-session quota"""
+    total = 0
+    for file_info in shared_state.session_file_list(session_id):
+        size = file_info.get("size")
+        if size is None:
+            try:
+                size = os.path.getsize(file_info["saved_path"])
+            except OSError:
+                size = 0
+        total += size
+    return total
+
+def get_retrieval_options(params):
+    """Read per-request k / rerank / candidates settings, clamped to sane bounds"""
+    k = min(max(int(params.get("k", 3)), 1), 20)
+    use_rerank = str(params.get("rerank", "false")).lower() in ("1", "true", "yes")
+    candidates = params.get("candidates")
+    if candidates is not None:
+        candidates = min(max(int(candidates), k), 100)
+    return {"k": k, "use_rerank": use_rerank, "candidates": candidates}
 
 def get_session_folder(session_id):
     """Get or create session-specific folder"""
@@ -36,26 +106,56 @@ def get_session_folder(session_id):
     os.makedirs(session_folder, exist_ok=True)
     return session_folder
 
+def remove_folder(folder):
+    """Delete a folder file by file; returns (files deleted, bytes freed)"""
+    files = freed = 0
+    for root, dirs, names in os.walk(folder, topdown=False):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            files += 1
+            freed += size
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(folder)
+    return files, freed
+
 def cleanup_session_files(session_id):
-    """Clean up files for a specific session"""
+    """Clean up files and the vector collection for a specific session
+
+    Returns (files deleted, bytes freed) for the session reaper's metrics.
+    """
+    files = freed = 0
     try:
+        drop_session_collection(session_id)
+
         session_folder = os.path.join(UPLOAD_FOLDER, f"session_{session_id}")
         if os.path.exists(session_folder):
-            shutil.rmtree(session_folder)
-            print(f"🗑️ Cleaned up session folder: {session_folder}")
+            files, freed = remove_folder(session_folder)
+            print(f"🗑️ Cleaned up session folder: {session_folder} ({files} files, {freed} bytes)")
 
         # Remove from session tracking
-        if session_id in session_files:
-            del session_files[session_id]
+        session_reaper.forget(session_id)
+        if shared_state.remove_session(session_id):
             print(f"🗑️ Removed session {session_id} from tracking")
     except Exception as e:
         print(f"❌ Error cleaning up session {session_id}: {str(e)}")
+    return files, freed
+
+# Expires idle sessions in the background; /upload no longer scans every session
+session_reaper = SessionReaper(
+    SESSION_TIMEOUT, cleanup_session_files, shared_state.last_activity, shared_state.session_activity
+)
 
 def cleanup_all_session_files():
     """Clean up all session files"""
     try:
         # Clean up all session folders
-        for session_id in list(session_files.keys()):
+        for session_id in shared_state.session_ids():
             cleanup_session_files(session_id)
 
         # Also clean up any orphaned session folders
@@ -74,131 +174,217 @@ def cleanup_all_session_files():
 
 def update_session_activity(session_id):
     """Update the last activity time for a session"""
-    session_last_activity[session_id] = time.time()
-
-def cleanup_inactive_sessions():
-    """Clean up sessions that have been inactive for more than 1 hour"""
-    current_time = time.time()
-    inactive_sessions = []
-
-    for session_id, last_activity in session_last_activity.items():
-        if current_time - last_activity > 3600:  # 1 hour
-            inactive_sessions.append(session_id)
-
-    for session_id in inactive_sessions:
-        print(f"🕐 Cleaning up inactive session: {session_id}")
-        cleanup_session_files(session_id)
-        if session_id in session_last_activity:
-            del session_last_activity[session_id]
+    shared_state.touch_session(session_id)
+    session_reaper.schedule(session_id)
 
 # Cleanup function to clear ChromaDB and session files on app shutdown
 def cleanup_chromadb():
+    shutdown_ingest_jobs()
+    if CHROMA_PERSIST:
+        # Sessions expire individually instead; the next start serves them straight from disk
+        print("💾 Persistent mode: keeping ChromaDB and session files for the next start")
+        return
+
     print("🧹 Cleaning up ChromaDB and session files before shutdown...")
     clear_chromadb()
     cleanup_all_session_files()
     print("🗑️ Cleared all session data")
 
-# Register cleanup function to run on app exit
-atexit.register(cleanup_chromadb)
-
 # Handle SIGINT (Ctrl+C) and SIGTERM signals
 def signal_handler(sig, frame):
     print(f"\n🛑 Received signal {sig}, shutting down gracefully...")
     cleanup_chromadb()
     exit(0)
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-
-
+def start_background_tasks():
+    """Start the session reaper, and load models in the background when WARMUP_ON_START is set
+
+    Called once the serving process exists (after the fork under serve.py), so
+    no model inference ever runs in a process that is about to fork.
+    """
+    session_reaper.start()
+    if WARMUP_ON_START:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+# Loader worker processes re-import this module; only the server process owns cleanup
+if multiprocessing.parent_process() is None:
+    restore_session_state()
+
+    # Register cleanup function to run on app exit
+    atexit.register(cleanup_chromadb)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+
+
+def collect_component_metrics():
+    """Counters the caches, LLM client and session reaper already keep, for /metrics"""
+    llm = llm_client.stats()
+    embeddings = embedding_cache.stats()
+    batching = embedding_service.stats()
+    answers = answer_cache.stats()
+    reaper = session_reaper.stats()
+    totals = collection_stats.totals()
+    return [
+        ("rag_llm_requests_total", "counter", "LLM requests, retries and failures",
+         value_samples("rag_llm_requests_total", {
+             (("outcome", "request"),): llm["requests"],
+             (("outcome", "retry"),): llm["retries"],
+             (("outcome", "failure"),): llm["failures"],
+         })),
+        ("rag_llm_request_seconds", "histogram", "LLM call latency",
+         latency_histogram_samples("rag_llm_request_seconds", llm["latency"])),
+        ("rag_llm_time_to_first_token_seconds", "histogram", "Time to the first streamed LLM token",
+         latency_histogram_samples("rag_llm_time_to_first_token_seconds", llm["time_to_first_token"])),
+        ("rag_embedding_cache_lookups_total", "counter", "Embedding cache lookups by result",
+         value_samples("rag_embedding_cache_lookups_total", {
+             (("result", "hit"),): embeddings["hits"],
+             (("result", "miss"),): embeddings["misses"],
+         })),
+        ("rag_embedding_batches_total", "counter", "Batches run by the embedding service",
+         value_samples("rag_embedding_batches_total", {(): batching["batches"]})),
+        ("rag_embedding_texts_total", "counter", "Texts embedded by the embedding service",
+         value_samples("rag_embedding_texts_total", {(): batching["texts"]})),
+        ("rag_embedding_queue_depth", "gauge", "Texts waiting for the embedding service",
+         value_samples("rag_embedding_queue_depth", {(): batching["queued_texts"]})),
+        ("rag_answer_cache_lookups_total", "counter", "Answer cache lookups by result",
+         value_samples("rag_answer_cache_lookups_total", {
+             (("result", "exact_hit"),): answers["exact_hits"],
+             (("result", "semantic_hit"),): answers["semantic_hits"],
+             (("result", "miss"),): answers["misses"],
+         })),
+        ("rag_sessions_reaped_total", "counter", "Idle sessions deleted by the reaper",
+         value_samples("rag_sessions_reaped_total", {(): reaper["sessions_reaped"]})),
+        ("rag_session_bytes_freed_total", "counter", "Upload bytes freed by the session reaper",
+         value_samples("rag_session_bytes_freed_total", {(): reaper["bytes_freed"]})),
+        ("rag_tracked_sessions", "gauge", "Sessions the reaper is tracking",
+         value_samples("rag_tracked_sessions", {(): reaper["tracked_sessions"]})),
+        ("rag_stored_chunks", "gauge", "Chunks stored across session collections",
+         value_samples("rag_stored_chunks", {(): totals["total_documents"]})),
+    ]
+
+registry.add_collector(collect_component_metrics)
+
+@app.before_request
+def start_request_trace():
+    # Callers can pass X-Request-ID to follow a request through the logs
+    g.trace_id = set_trace_id(request.headers.get("X-Request-ID"))
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def finish_request_trace(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    http_requests.inc(method=request.method, route=route, status=response.status_code)
+    if "request_started" in g:
+        http_request_seconds.observe(time.perf_counter() - g.request_started, route=route)
+    if "trace_id" in g:
+        response.headers["X-Request-ID"] = g.trace_id
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    if isinstance(e, UploadTooLarge):
+        return jsonify({"error": e.description}), 413
+    return jsonify({"error": f"Request body is larger than the {MAX_REQUEST_BYTES} byte limit"}), 413
 
 @app.route("/upload", methods=["POST"])
 def upload_file():
-    print("📩 Received upload request")
-    print("📎 request.files:", request.files)
-    print("📎 request.form:", request.form)
-    print("📎 request.content_type:", request.content_type)
-    print("📎 request.headers:", dict(request.headers))
+    # request.files / request.form are never touched: they would spool the whole body first
+    logger.debug("📩 Received upload request")
+    logger.debug("📎 request.content_type: %s, content_length: %s", request.content_type, request.content_length)
+    logger.debug("📎 request.headers: %s", request.headers)
 
     try:
         # Get or create session ID
         if 'session_id' not in session:
             session['session_id'] = str(uuid.uuid4())
             session.permanent = True  # Make session permanent (with timeout)
-            session_files[session['session_id']] = []
-            print(f"🆔 Created new session: {session['session_id']}")
+            logger.info("🆔 Created new session: %s", session['session_id'])
         else:
-            print(f"🆔 Using existing session: {session['session_id']}")
+            logger.debug("🆔 Using existing session: %s", session['session_id'])
 
         # Update session activity
         update_session_activity(session['session_id'])
 
-        # Clean up inactive sessions
-        cleanup_inactive_sessions()
-
-        files = request.files.getlist("file")  # 👈 NOTE: Frontend should send 'file'
-        print(f"📋 Found {len(files)} files in request")
-
-        if not files:
-            print("🚫 No files uploaded - files list is empty")
+        boundary = request.mimetype_params.get("boundary")
+        if request.mimetype != "multipart/form-data" or not boundary:
+            logger.info("🚫 No files uploaded - not a multipart request")
             return jsonify({"error": "No files uploaded"}), 400
 
-        # Check if files are actually file objects or empty
-        valid_files = [f for f in files if f and f.filename != ""]
-        print(f"📋 Valid files after filtering: {len(valid_files)}")
-
-        if not valid_files:
-            print("🚫 No valid files - all files have empty filenames")
-            return jsonify({"error": "No valid files uploaded"}), 400
-
-        file_paths = []
-        uploaded_file_info = []
+        session_id = session['session_id']
+        remaining = MAX_SESSION_BYTES - session_upload_bytes(session_id)
+        if remaining <= 0:
+            return jsonify({"error": f"Session upload quota of {MAX_SESSION_BYTES} bytes is used up"}), 413
 
         # Get session-specific folder
-        session_folder = get_session_folder(session['session_id'])
-
-        for file in valid_files:
-            print(f"📄 Processing file: {file.filename} (type: {file.content_type})")
+        session_folder = get_session_folder(session_id)
 
+        def target_path(filename):
             # Unique file name in session folder
-            filename = f"{uuid.uuid4()}_{file.filename}"
-            file_path = os.path.join(session_folder, filename)
-            file.save(file_path)
-            print(f"📂 Saved to session folder: {file_path}")
-            file_paths.append(file_path)
+            return os.path.join(session_folder, f"{uuid.uuid4()}_{os.path.basename(filename)}")
+
+        # Each file part goes straight from the request body to its final path
+        try:
+            with span("file_save"):
+                uploaded_file_info = receive_files(
+                    request.stream, boundary, "file", target_path,  # 👈 NOTE: Frontend should send 'file'
+                    max_file_bytes=MAX_FILE_BYTES, max_total_bytes=remaining
+                )
+        except RequestEntityTooLarge as e:
+            # Over MAX_REQUEST_BYTES, MAX_FILE_BYTES or the session's remaining quota
+            logger.warning("🚫 Upload rejected: %s", e.description)
+            return request_too_large(e)
+        except ValueError as e:
+            logger.info("🚫 Malformed upload: %s", e)
+            return jsonify({"error": f"Malformed upload: {str(e)}"}), 400
+        logger.debug("📋 Received %d files", len(uploaded_file_info))
 
+        file_paths = []
+        for file_info in uploaded_file_info:
+            logger.info("📂 Saved to session folder: %s (%d bytes, sha256 %s)",
+                        file_info["saved_path"], file_info["size"], file_info["file_hash"][:12])
+            file_paths.append(file_info["saved_path"])
             # Track file info for this session
-            file_info = {
-                "original_name": file.filename,
-                "saved_path": file_path,
-                "upload_time": time.time(),
-                "content_type": file.content_type
-            }
-            uploaded_file_info.append(file_info)
-            session_files[session['session_id']].append(file_info)
+            shared_state.add_session_file(session_id, file_info)
 
         if not file_paths:
-            print("🚫 No file paths created")
+            logger.info("🚫 No valid files - none had a filename")
             return jsonify({"error": "No valid files uploaded"}), 400
 
-        print(f"🚀 Starting RAG pipeline with {len(file_paths)} files")
-        # Run RAG pipeline
-        result = process_with_rag_pipeline(file_paths)
-        print(f"✅ RAG pipeline result: {result}")
+        # Hand the saved files to the background ingestion pool
+        try:
+            job_id = submit_ingest_job(session['session_id'], uploaded_file_info)
+        except JobQueueFull as e:
+            logger.warning("🚦 Ingestion queue full: %s", e)
+            return jsonify({"error": str(e)}), 503
 
-        if result:
-            return jsonify({
-                "message": "Files processed successfully",
-                "session_id": session['session_id'],
-                "uploaded_files": uploaded_file_info
-            }), 200
-        else:
-            return jsonify({"error": "RAG pipeline failed"}), 500
+        return jsonify({
+            "message": "Files uploaded, processing started",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+            "session_id": session['session_id'],
+            "uploaded_files": uploaded_file_info
+        }), 202
+
+    except Exception as e:
+        logger.exception("🔥 Exception in /upload: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """Report per-file ingestion progress for an upload job"""
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+
+        if 'session_id' in session:
+            update_session_activity(session['session_id'])
 
+        return jsonify(job), 200
     except Exception as e:
-        print("🔥 Exception in /upload:", str(e))
-        import traceback
-        traceback.print_exc()
+        logger.error("🔥 Error in /jobs: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/query", methods=["POST"])
@@ -208,15 +394,146 @@ def query():
     if not user_query:
         return jsonify({"error": "No query provided"}), 400
 
+    try:
+        options = get_retrieval_options(request.json)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k and candidates must be integers"}), 400
+    if options["use_rerank"] and not reranker_available():
+        return jsonify({"error": RERANKER_UNAVAILABLE}), 503
+
     try:
         # Update session activity if session exists
         if 'session_id' in session:
             update_session_activity(session['session_id'])
 
-        answer = query_with_rag(user_query)
-        return jsonify({"answer": answer}), 200
+        if 'session_id' not in session:
+            return jsonify({"answer": "📂 Please upload documents so I can answer your question."}), 200
+
+        result = answer_query(user_query, session['session_id'], **options)
+        return jsonify(result), 200
     except Exception as e:
-        print("🔥 Error in /query:", str(e))
+        logger.error("🔥 Error in /query: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/query/stream", methods=["GET", "POST"])
+def query_stream():
+    """Stream the retrieved sources and then the answer tokens as server-sent events"""
+    if request.method == "POST":
+        params = request.get_json(silent=True) or {}
+    else:
+        params = request.args
+    user_query = params.get("query")
+
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
+
+    try:
+        options = get_retrieval_options(params)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k and candidates must be integers"}), 400
+    if options["use_rerank"] and not reranker_available():
+        return jsonify({"error": RERANKER_UNAVAILABLE}), 503
+
+    session_id = session.get('session_id')
+    if session_id:
+        update_session_activity(session_id)
+
+    def generate():
+        for event, data in stream_query_with_rag(user_query, session_id, **options):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/query/batch", methods=["POST"])
+def query_batch():
+    """Answer a list of questions, streaming one NDJSON line per question as it completes
+
+    Lines arrive in completion order and carry the question's "index"; a
+    question that fails gets an "error" line instead of failing the batch.
+    """
+    params = request.get_json(silent=True) or {}
+    queries = params.get("queries")
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "queries must be a non-empty list"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+
+    try:
+        options = get_retrieval_options(params)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k and candidates must be integers"}), 400
+    if options["use_rerank"] and not reranker_available():
+        return jsonify({"error": RERANKER_UNAVAILABLE}), 503
+
+    session_id = session.get('session_id')
+    if session_id:
+        update_session_activity(session_id)
+
+    def generate():
+        valid = []
+        for index, user_query in enumerate(queries):
+            if isinstance(user_query, str) and user_query.strip():
+                valid.append(index)
+            else:
+                yield json.dumps({"index": index, "query": user_query, "error": "No query provided"}) + "\n"
+        if not valid:
+            return
+        if not session_id:
+            for index in valid:
+                yield json.dumps({"index": index, "query": queries[index], "answer": NO_DOCUMENTS_ANSWER}) + "\n"
+            return
+
+        results = answer_queries([queries[index] for index in valid], session_id, **options)
+        for position, result in results:
+            index = valid[position]
+            yield json.dumps({"index": index, "query": queries[index], **result}) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/search", methods=["GET", "POST"])
+def search():
+    """Return ranked chunks with their scores for a query, without generating an answer"""
+    if request.method == "POST":
+        params = request.get_json(silent=True) or {}
+    else:
+        params = request.args
+    user_query = params.get("query")
+
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
+
+    try:
+        limit = min(max(int(params.get("limit", params.get("k", 10))), 1), 100)
+        offset = min(max(int(params.get("offset", 0)), 0), max(SEARCH_MAX_RESULTS - limit, 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    filters = params.get("filters")
+    try:
+        if isinstance(filters, str):
+            # GET requests pass filters as a JSON string
+            filters = json.loads(filters)
+        build_search_filter(filters)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filters: {str(e)}"}), 400
+
+    try:
+        if 'session_id' not in session:
+            return jsonify({"results": [], "offset": offset, "limit": limit, "has_more": False}), 200
+
+        update_session_activity(session['session_id'])
+        return jsonify(search_chunks(user_query, session['session_id'], limit, offset, filters)), 200
+    except Exception as e:
+        logger.error("🔥 Error in /search: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/clear", methods=["POST"])
@@ -241,10 +558,7 @@ def clear_session():
 
         session_id = session['session_id']
 
-        # Clear ChromaDB
-        clear_chromadb()
-
-        # Clean up session files
+        # Drop this session's collection and files; other sessions keep their data
         cleanup_session_files(session_id)
 
         # Clear session
@@ -269,7 +583,7 @@ def get_session_files():
         # Update session activity
         update_session_activity(session_id)
 
-        files = session_files.get(session_id, [])
+        files = shared_state.session_file_list(session_id)
 
         # Format file info for frontend
         formatted_files = []
@@ -302,21 +616,72 @@ def heartbeat():
         print("🔥 Error in /heartbeat:", str(e))
         return jsonify({"error": str(e)}), 500
 
+@app.route("/warmup", methods=["POST"])
+def warmup():
+    """Load models and start the vector store now instead of on the first request"""
+    try:
+        params = request.get_json(silent=True) or {}
+        include_reranker = str(params.get("rerank", request.args.get("rerank", "false"))).lower() in ("1", "true", "yes")
+        if include_reranker and not reranker_available():
+            return jsonify({"error": RERANKER_UNAVAILABLE}), 503
+        timings = warm_up(include_reranker=include_reranker)
+        return jsonify({"status": "warm", "seconds": timings}), 200
+    except Exception as e:
+        print("🔥 Error in /warmup:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once the embedding model and vector store are loaded, 503 before"""
+    status = readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route("/sessions/stats", methods=["GET"])
+def get_session_stats():
+    """Session reaper counters: sessions reaped, files deleted and bytes freed"""
+    try:
+        return jsonify(session_reaper.stats()), 200
+    except Exception as e:
+        print("🔥 Error in /sessions/stats:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: per-stage latency histograms, request counters and component counters"""
+    try:
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+    except Exception as e:
+        logger.error("🔥 Error in /metrics: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/llm/stats", methods=["GET"])
+def get_llm_stats():
+    """Upstream LLM request counters and latency histograms"""
+    try:
+        return jsonify(llm_client.stats()), 200
+    except Exception as e:
+        print("🔥 Error in /llm/stats:", str(e))
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/chromadb/status", methods=["GET"])
 def get_chromadb_status():
     """Get ChromaDB status and document count"""
     try:
-        from utils.ragPipeline import db
-
-        # Get collection info
-        collection = db.get()
-        total_docs = len(collection['ids'])
+        # Counts come from the stats layer, so this stays cheap enough for health probes
+        stats = get_chromadb_stats(session.get('session_id'))
+        session_stats = stats.get("session", {"total_documents": 0, "sources": []})
+        total_docs = session_stats["total_documents"]
 
         is_empty = total_docs == 0
 
         return jsonify({
             "is_empty": is_empty,
             "total_documents": total_docs,
+            "sources": session_stats["sources"],
+            "all_sessions": {"collections": stats["collections"], "total_documents": stats["total_documents"]},
+            "embedding_cache": embedding_cache.stats(),
+            "embedding_service": embedding_service.stats(),
+            "answer_cache": answer_cache.stats(),
             "status": "empty" if is_empty else "has_data",
             "message": f"ChromaDB {'is empty' if is_empty else f'contains {total_docs} documents'}"
         }), 200
@@ -325,8 +690,14 @@ def get_chromadb_status():
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
-    print("🚀 Starting RAG Chatbot with in-memory ChromaDB...")
-    print("📝 Note: ChromaDB data will be cleared when the session ends")
+    if CHROMA_PERSIST:
+        print(f"🚀 Starting RAG Chatbot with persistent ChromaDB at {CHROMA_PATH}...")
+        print("📝 Note: sessions expire after 1 hour of inactivity; data survives restarts")
+    else:
+        print("🚀 Starting RAG Chatbot with in-memory ChromaDB...")
+        print("📝 Note: ChromaDB data will be cleared when the session ends")
+    print("🛠️ Development server; use `python serve.py` for multi-worker production serving")
+    start_background_tasks()
     app.run(debug=True)
     
 
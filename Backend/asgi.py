@@ -0,0 +1,201 @@
+"""ASGI entry point: /query and /query/stream run async, every other route is the Flask app
+
+Retrieval runs on a small thread pool and the LLM call is awaited on the
+event loop, so one process keeps hundreds of queries in flight without a
+thread parked on each. Run with `python asgi.py` or `uvicorn asgi:application`.
+Honours WEB_BIND and WEB_WORKERS like serve.py.
+"""
+import os
+import json
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+import app as rag_app
+from utils.ragPipeline import NO_DOCUMENTS_ANSWER
+from utils.llmClient import llm_client
+from utils.asyncQuery import run_blocking, answer_query_async, stream_query_async, shutdown_retrieval_pool
+from utils.reranker import reranker_available, RERANKER_UNAVAILABLE
+from utils.logger import get_logger, set_trace_id
+from utils.metrics import http_requests, http_request_seconds
+
+# Threads for the synchronous Flask routes (uploads, status, ...)
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "16"))
+
+flask_app = WSGIMiddleware(rag_app.app, workers=WSGI_THREADS)
+logger = get_logger("asgi")
+
+
+def read_session(headers):
+    """Decode Flask's signed session cookie; {} when it is missing or invalid"""
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    morsel = cookie.get(rag_app.app.config["SESSION_COOKIE_NAME"])
+    if morsel is None:
+        return {}
+    serializer = rag_app.app.session_interface.get_signing_serializer(rag_app.app)
+    try:
+        max_age = int(rag_app.app.permanent_session_lifetime.total_seconds())
+        return serializer.loads(morsel.value, max_age=max_age)
+    except BadSignature:
+        return {}
+
+
+def cors_headers(headers):
+    # Same policy as CORS(app, supports_credentials=True) on the Flask side
+    origin = headers.get("origin")
+    if not origin:
+        return []
+    return [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, headers, payload, status=200):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                   + cors_headers(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_params(scope, receive):
+    """Query string or JSON body parameters; None when a POST body is not a JSON object"""
+    if scope["method"] == "POST":
+        try:
+            params = json.loads(await read_body(receive) or b"{}")
+        except ValueError:
+            return None
+        return params if isinstance(params, dict) else None
+    return dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+
+
+async def query(scope, receive, send, headers):
+    params = await read_params(scope, receive)
+    if params is None:
+        return await send_json(send, headers, {"error": "Request body must be a JSON object"}, 400)
+    user_query = params.get("query")
+    if not user_query:
+        return await send_json(send, headers, {"error": "No query provided"}, 400)
+
+    try:
+        options = rag_app.get_retrieval_options(params)
+    except (TypeError, ValueError):
+        return await send_json(send, headers, {"error": "k and candidates must be integers"}, 400)
+    if options["use_rerank"] and not reranker_available():
+        return await send_json(send, headers, {"error": RERANKER_UNAVAILABLE}, 503)
+
+    try:
+        session_id = read_session(headers).get("session_id")
+        if not session_id:
+            return await send_json(send, headers, {"answer": NO_DOCUMENTS_ANSWER})
+        await run_blocking(rag_app.update_session_activity, session_id)
+
+        result = await answer_query_async(user_query, session_id, **options)
+        await send_json(send, headers, result)
+    except Exception as e:
+        logger.error("🔥 Error in async /query: %s", e)
+        await send_json(send, headers, {"error": str(e)}, 500)
+
+
+async def query_stream(scope, receive, send, headers):
+    """Server-sent events, same format as the Flask /query/stream route"""
+    params = await read_params(scope, receive)
+    if params is None:
+        return await send_json(send, headers, {"error": "Request body must be a JSON object"}, 400)
+    user_query = params.get("query")
+    if not user_query:
+        return await send_json(send, headers, {"error": "No query provided"}, 400)
+
+    try:
+        options = rag_app.get_retrieval_options(params)
+    except (TypeError, ValueError):
+        return await send_json(send, headers, {"error": "k and candidates must be integers"}, 400)
+    if options["use_rerank"] and not reranker_available():
+        return await send_json(send, headers, {"error": RERANKER_UNAVAILABLE}, 503)
+
+    session_id = read_session(headers).get("session_id")
+    if session_id:
+        await run_blocking(rag_app.update_session_activity, session_id)
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ] + cors_headers(headers),
+    })
+    async for event, data in stream_query_async(user_query, session_id, **options):
+        chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+ASYNC_ROUTES = {
+    ("/query", "POST"): query,
+    ("/query/stream", "GET"): query_stream,
+    ("/query/stream", "POST"): query_stream,
+}
+
+
+async def traced(handler, scope, receive, send, headers):
+    """Same trace id, X-Request-ID header and request metrics as the Flask hooks"""
+    trace_id = set_trace_id(headers.get("x-request-id"))
+    started = time.perf_counter()
+
+    async def send_traced(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", trace_id.encode())]}
+            http_requests.inc(method=scope["method"], route=scope["path"], status=message["status"])
+            http_request_seconds.observe(time.perf_counter() - started, route=scope["path"])
+        await send(message)
+
+    await handler(scope, receive, send_traced, headers)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            rag_app.start_background_tasks()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await llm_client.aclose()
+            shutdown_retrieval_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http":
+        handler = ASYNC_ROUTES.get((scope["path"], scope["method"]))
+        if handler is not None:
+            headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+            return await traced(handler, scope, receive, send, headers)
+    # Everything else, CORS preflights included, is served by Flask
+    await flask_app(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from serve import WEB_BIND, worker_count
+    host, _, port = WEB_BIND.rpartition(":")
+    uvicorn.run("asgi:application", host=host or "0.0.0.0", port=int(port), workers=worker_count())
@@ -0,0 +1,96 @@
+"""Cold-start benchmark: how long a fresh process takes to import the app and to get warm
+
+Each run starts a new Python process, so nothing is shared between runs.
+Usage: python benchmarks/cold_start.py [--runs 5] [--output cold_start.json]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process; prints one JSON line with its timings
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+ready_before = client.get("/ready").status_code
+client.post("/warmup")
+warmed = time.perf_counter()
+ready_after = client.get("/ready").status_code
+from utils.ragPipeline import embedding_service
+query_started = time.perf_counter()
+embedding_service.embed_query("how long does a warm query embedding take?")
+print("COLD_START " + json.dumps({
+    "import_seconds": imported - started,
+    "warmup_seconds": warmed - imported,
+    "warm_query_embed_ms": (time.perf_counter() - query_started) * 1000,
+    "ready_before_warmup": ready_before,
+    "ready_after_warmup": ready_after,
+}))
+"""
+
+
+def run_once():
+    # Importing the app clears session tracking and its exit cleanup deletes uploaded_files/session_*,
+    # so the probe runs in a scratch directory with in-memory storage, away from any live server's state
+    workdir = tempfile.mkdtemp(prefix="rag-cold-start-")
+    python_path = os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))
+    env = {**os.environ, "WARMUP_ON_START": "0", "PYTHONPATH": python_path}
+    for name in ("CHROMA_PERSIST", "CHROMA_HOST", "SHARED_STATE_PATH"):
+        env.pop(name, None)
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=workdir, capture_output=True, text=True, env=env,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("COLD_START "):
+            return json.loads(line[len("COLD_START "):])
+    raise RuntimeError(f"Probe failed:\n{result.stderr[-2000:]}")
+
+
+def summarize(values):
+    return {
+        "min": round(min(values), 4),
+        "median": round(statistics.median(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = []
+    for number in range(args.runs):
+        runs.append(run_once())
+        print(f"⏱️ Run {number + 1}/{args.runs}: import {runs[-1]['import_seconds']:.2f}s, "
+              f"warmup {runs[-1]['warmup_seconds']:.2f}s")
+
+    results = {
+        "runs": args.runs,
+        "import_seconds": summarize([run["import_seconds"] for run in runs]),
+        "warmup_seconds": summarize([run["warmup_seconds"] for run in runs]),
+        "warm_query_embed_ms": summarize([run["warm_query_embed_ms"] for run in runs]),
+        "ready_before_warmup": runs[0]["ready_before_warmup"],
+        "ready_after_warmup": runs[0]["ready_after_warmup"],
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
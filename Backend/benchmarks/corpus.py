@@ -0,0 +1,157 @@
+"""Synthetic PDF / DOCX / TXT corpus for the benchmarks
+
+Files are written with the standard library only, so generating a corpus needs
+nothing beyond what the backend already installs. Content is seeded, so the
+same arguments always give byte-identical files. Every file carries a few
+"facts" that the query benchmark asks about.
+"""
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "system data model index query vector document page section report policy customer order "
+    "invoice payment network server client request response latency throughput cache memory "
+    "storage disk cluster node region account project release version feature issue ticket "
+    "support contract service level agreement incident review budget forecast quarter revenue "
+    "cost margin supplier warehouse shipment inventory product catalogue price discount tax "
+    "employee manager team meeting schedule deadline milestone risk audit compliance security "
+    "access control token password backup restore migration upgrade deployment pipeline build "
+    "test coverage metric dashboard alert threshold capacity growth usage trend analysis summary"
+).split()
+PROJECTS = ("Aurora", "Basalt", "Cobalt", "Dynamo", "Ember", "Falcon", "Granite", "Harbor",
+            "Indigo", "Juniper", "Kestrel", "Lumen", "Meridian", "Nimbus", "Onyx", "Pioneer")
+FORMATS = ("pdf", "docx", "txt")
+
+
+def make_fact(rng):
+    project = rng.choice(PROJECTS)
+    code = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.randint(1000, 9999)}"
+    return {
+        "sentence": f"The access code for project {project} is {code}.",
+        "question": f"What is the access code for project {project}?",
+        "answer": code,
+    }
+
+
+def make_page(rng, words_per_page, fact=None):
+    """A page of filler sentences, with the fact sentence dropped in somewhere"""
+    sentences = []
+    count = 0
+    while count < words_per_page:
+        length = rng.randint(8, 20)
+        words = [rng.choice(WORDS) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + ".")
+        count += length
+    if fact is not None:
+        sentences.insert(rng.randrange(len(sentences) + 1), fact["sentence"])
+    return " ".join(sentences)
+
+
+def wrap(text, width=90):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_txt(path, pages):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join("\n".join(wrap(page)) for page in pages))
+
+
+def write_pdf(path, pages):
+    """Minimal PDF: one Helvetica text stream per page, extractable by pypdf"""
+    def pdf_string(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    page_count = len(pages)
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count))
+         + f"] /Count {page_count} >>").encode("latin-1"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page in enumerate(pages):
+        lines = "\n".join(f"({pdf_string(line)}) Tj T*" for line in wrap(page))
+        stream = f"BT /F1 10 Tf 12 TL 50 800 Td\n{lines}\nET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path, pages):
+    """Minimal DOCX: one paragraph per page, readable by docx2txt"""
+    paragraphs = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(page)}</w:t></w:r></w:p>' for page in pages
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{paragraphs}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", content_types)
+        docx.writestr("_rels/.rels", rels)
+        docx.writestr("word/document.xml", document)
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "txt": write_txt}
+
+
+def generate_corpus(directory, files=6, pages=10, words_per_page=400, formats=FORMATS, seed=0):
+    """Write `files` documents (formats used in turn) into `directory`
+
+    Returns {"files": [paths], "facts": [fact dicts], "bytes": total size}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths, facts = [], []
+    for number in range(files):
+        file_format = formats[number % len(formats)]
+        fact = make_fact(rng)
+        fact_page = rng.randrange(pages)
+        content = [make_page(rng, words_per_page, fact if i == fact_page else None) for i in range(pages)]
+        path = os.path.join(directory, f"doc_{number:03d}.{file_format}")
+        WRITERS[file_format](path, content)
+        paths.append(path)
+        facts.append(fact)
+    return {"files": paths, "facts": facts, "bytes": sum(os.path.getsize(path) for path in paths)}
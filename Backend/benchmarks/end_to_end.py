@@ -0,0 +1,331 @@
+"""End-to-end benchmark: ingestion stage throughput and /query latency under concurrency
+
+Generates a synthetic PDF/DOCX/TXT corpus, times each ingestion stage (load,
+split, embed, store) on its own, then uploads the corpus through the real
+HTTP API and fires concurrent /query requests at it. Answers come from
+mock_llm_server.py with a configurable delay, so no Groq key is needed and the
+numbers do not depend on a remote service.
+
+Everything runs in a scratch directory (uploads, caches, shared state), so
+nothing from an earlier run warms this one. Results are written as JSON with the
+git commit they were measured on; pass --compare to diff against an earlier file.
+
+Usage: python benchmarks/end_to_end.py [--files 6] [--pages 10] [--concurrency 1,8,32]
+                                       [--output results.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import socket
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from corpus import generate_corpus, FORMATS  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.fmean(ordered), 2), "max_ms": round(ordered[-1], 2),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds else None
+
+
+def bench_stages(paths):
+    """Time load, split, embed and store separately, in this process, without caches"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from utils.processFiles import get_loader, CHUNK_SIZE, CHUNK_OVERLAP
+    from utils.ragPipeline import embedding_service, get_session_db, iter_batches, INGEST_BATCH_SIZE
+
+    started = time.perf_counter()
+    pages = []
+    for path in paths:
+        pages.extend(get_loader(path).load())
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    chunks = splitter.split_documents(pages)
+    split_seconds = time.perf_counter() - started
+
+    texts = [chunk.page_content for chunk in chunks]
+    started = time.perf_counter()
+    embeddings = []
+    for batch in iter_batches(texts, INGEST_BATCH_SIZE):
+        embeddings.extend(embedding_service.embed_documents(batch))
+    embed_seconds = time.perf_counter() - started
+
+    collection = get_session_db("benchmark-stages")._collection
+    started = time.perf_counter()
+    for offset in range(0, len(texts), INGEST_BATCH_SIZE):
+        end = offset + INGEST_BATCH_SIZE
+        collection.upsert(
+            ids=[f"stage:{i}" for i in range(offset, min(end, len(texts)))],
+            embeddings=embeddings[offset:end],
+            documents=texts[offset:end],
+            metadatas=[chunk.metadata for chunk in chunks[offset:end]],
+        )
+    store_seconds = time.perf_counter() - started
+
+    characters = sum(len(text) for text in texts)
+    return {
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "load": {"seconds": round(load_seconds, 4), "pages_per_second": rate(len(pages), load_seconds)},
+        "split": {"seconds": round(split_seconds, 4), "chunks_per_second": rate(len(chunks), split_seconds)},
+        "embed": {"seconds": round(embed_seconds, 4), "chunks_per_second": rate(len(chunks), embed_seconds),
+                  "characters_per_second": rate(characters, embed_seconds)},
+        "store": {"seconds": round(store_seconds, 4), "chunks_per_second": rate(len(chunks), store_seconds)},
+    }
+
+
+def start_server(app, port):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-server", daemon=True).start()
+    return server
+
+
+def bench_upload(base_url, paths, timeout=600):
+    """Upload the corpus through /upload and wait for the ingestion job"""
+    import requests
+    client = requests.Session()
+    started = time.perf_counter()
+    handles = [open(path, "rb") for path in paths]
+    try:
+        response = client.post(f"{base_url}/upload",
+                               files=[("file", (os.path.basename(h.name), h)) for h in handles])
+    finally:
+        for handle in handles:
+            handle.close()
+    response.raise_for_status()
+    accepted = time.perf_counter()
+
+    job_id = response.json()["job_id"]
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"{base_url}/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.05)
+    else:
+        raise RuntimeError(f"Ingestion job {job_id} did not finish within {timeout}s")
+    finished = time.perf_counter()
+
+    chunks = sum(f.get("chunks", 0) or 0 for f in job["files"])
+    return client, {
+        "status": job["status"],
+        "files": len(paths),
+        "chunks": chunks,
+        "accept_seconds": round(accepted - started, 4),
+        "total_seconds": round(finished - started, 4),
+        "chunks_per_second": rate(chunks, finished - started),
+    }
+
+
+def bench_queries(base_url, cookies, questions, concurrency, total, endpoint):
+    """Send `total` queries with `concurrency` in flight; latencies in ms"""
+    import requests
+    local = threading.local()
+
+    def one(number):
+        if not hasattr(local, "client"):
+            local.client = requests.Session()
+            local.client.cookies.update(cookies)
+        # Distinct query text, so --answer-cache runs still miss on exact matches
+        query = f"{questions[number % len(questions)]} (request {number})"
+        started = time.perf_counter()
+        try:
+            if endpoint == "stream":
+                with local.client.post(f"{base_url}/query/stream", json={"query": query}, stream=True) as response:
+                    first_token = None
+                    for line in response.iter_lines(decode_unicode=True):
+                        if first_token is None and line == "event: token":
+                            first_token = (time.perf_counter() - started) * 1000
+                    ok = response.status_code == 200
+            else:
+                response = local.client.post(f"{base_url}/query", json={"query": query})
+                first_token = None
+                # LLM failures come back as a 200 with the error in the answer text
+                ok = response.status_code == 200 and not response.json().get("answer", "❌").startswith("❌")
+        except requests.RequestException:
+            ok, first_token = False, None
+        return ok, (time.perf_counter() - started) * 1000, first_token
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for ok, latency, _ in results if ok]
+    summary = {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "seconds": round(elapsed, 4),
+        "requests_per_second": rate(len(latencies), elapsed),
+        **percentiles(latencies),
+    }
+    first_tokens = [first for ok, _, first in results if ok and first is not None]
+    if first_tokens:
+        summary["time_to_first_token"] = percentiles(first_tokens)
+    return summary
+
+
+def compare(results, baseline):
+    """Print the change in the headline numbers against an earlier results file"""
+    def metrics(data):
+        values = {}
+        for stage, info in data.get("stages", {}).items():
+            if isinstance(info, dict):
+                for key, value in info.items():
+                    if key.endswith("_per_second"):
+                        values[f"stages.{stage}.{key}"] = value
+        values["upload.chunks_per_second"] = data.get("upload", {}).get("chunks_per_second")
+        for level in data.get("queries", []):
+            for key in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second"):
+                values[f"queries.c{level['concurrency']}.{key}"] = level.get(key)
+        return values
+
+    print(f"\n📊 Compared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    old, new = metrics(baseline), metrics(results)
+    for name, value in new.items():
+        before = old.get(name)
+        if value is None or not before:
+            continue
+        print(f"  {name:40s} {before:>10} -> {value:>10} ({(value - before) / before * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--pages", type=int, default=10, help="pages per file")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated subset of pdf,docx,txt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--queries", type=int, default=64, help="queries per concurrency level")
+    parser.add_argument("--endpoint", choices=("query", "stream"), default="query")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="mock LLM seconds before the first byte")
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix="rag-benchmark-")
+    # The app's own exit cleanup works on relative paths, so the scratch directory stays the
+    # working directory until exit; registered first, it is removed after that cleanup has run
+    atexit.register(shutil.rmtree, workdir, True)
+    llm_port = free_port()
+    # Must be set before the app is imported: caches, shared state and the LLM URL are read at import
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{llm_port}/openai/v1/chat/completions"
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.pop("CHROMA_PERSIST", None)
+    os.environ.pop("CHROMA_HOST", None)
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE_TTL_SECONDS"] = "0"
+    os.chdir(workdir)
+
+    corpus = generate_corpus(os.path.join(workdir, "corpus"), args.files, args.pages,
+                             args.words_per_page, tuple(args.formats.split(",")), args.seed)
+    print(f"📚 Generated {args.files} files ({corpus['bytes']} bytes) in {workdir}")
+
+    import mock_llm_server
+    llm_server = mock_llm_server.run(llm_port, args.llm_delay, args.llm_token_delay)
+    threading.Thread(target=llm_server.serve_forever, name="mock-llm", daemon=True).start()
+
+    started = time.perf_counter()
+    import app as rag_app
+    from utils.ragPipeline import warm_up
+    warm_up()
+    startup_seconds = time.perf_counter() - started
+
+    print("⏱️ Timing ingestion stages...")
+    stages = bench_stages(corpus["files"])
+
+    app_port = free_port()
+    server = start_server(rag_app.app, app_port)
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    print("⏱️ Uploading corpus through /upload...")
+    client, upload = bench_upload(base_url, corpus["files"])
+
+    questions = [fact["question"] for fact in corpus["facts"]]
+    queries = []
+    for level in [int(c) for c in args.concurrency.split(",")]:
+        print(f"⏱️ {args.queries} queries at concurrency {level}...")
+        queries.append(bench_queries(base_url, client.cookies.get_dict(), questions, level,
+                                     args.queries, args.endpoint))
+    server.shutdown()
+    llm_server.shutdown()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "corpus": {"files": len(corpus["files"]), "bytes": corpus["bytes"]},
+        "startup_seconds": round(startup_seconds, 4),
+        "stages": stages,
+        "upload": upload,
+        "queries": queries,
+    }
+
+    print(json.dumps(results, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,38 @@
-from utils.ragPipeline import check_if_chromadb_empty, db
+from utils.ragPipeline import check_if_chromadb_empty, get_chromadb_stats, load_persisted_state, session_dbs, persisted_sessions
 
 def check_chromadb_status():
     print("🔍 Checking ChromaDB status...")
-    
-    # Method 1: Use existing function
-    result = check_if_chromadb_empty()
-    if result == 0:
-        print("✅ ChromaDB is EMPTY")
-    else:
-        print("📚 ChromaDB has data")
-    
-    # Method 2: Direct check with more details
-    try:
-        collection = db.get()
-        total_docs = len(collection['ids'])
-        
-        print(f"📊 Total documents: {total_docs}")
-        
-        if total_docs > 0:
-            print(f"📄 Document IDs (first 5): {collection['ids'][:5]}")
-            if collection.get('metadatas'):
-                print(f"📋 Sample metadata: {collection['metadatas'][0] if collection['metadatas'] else 'None'}")
+
+    # Pick up collections left on disk when running in persistent mode
+    load_persisted_state()
+
+    totals = get_chromadb_stats()
+    print(f"📊 {totals['collections']} session collections, {totals['total_documents']} documents in total")
+
+    session_ids = set(session_dbs) | set(persisted_sessions)
+    if not session_ids:
+        print("🗂️ No session collections in ChromaDB")
+        return
+
+    for session_id in sorted(session_ids):
+        print(f"\n🆔 Session {session_id}")
+
+        # Method 1: Use existing function
+        result = check_if_chromadb_empty(session_id)
+        if result == 0:
+            print("✅ Collection is EMPTY")
         else:
-            print("🗂️ No documents found in ChromaDB")
-            
-    except Exception as e:
-        print(f"❌ Error checking ChromaDB: {str(e)}")
+            print("📚 Collection has data")
+
+        # Method 2: Per-source breakdown from the stats layer (no row scans)
+        try:
+            stats = get_chromadb_stats(session_id)["session"]
+            print(f"📊 Total documents: {stats['total_documents']}")
+            for source in stats["sources"]:
+                print(f"📄 {source['name']}: {source['chunks']} chunks")
+
+        except Exception as e:
+            print(f"❌ Error checking ChromaDB: {str(e)}")
 
 if __name__ == "__main__":
     check_chromadb_status()
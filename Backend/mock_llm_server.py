@@ -0,0 +1,98 @@
+import argparse
+import json
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Minimal stand-in for the OpenAI-compatible chat completions endpoint.
+# Point the backend at it with:
+#   GROQ_API_URL=http://localhost:8001/openai/v1/chat/completions python app.py
+
+MOCK_ANSWER = "This is a mock answer generated from the retrieved documents."
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY each keep-alive
+    # response stalls ~40ms on delayed ACKs
+    disable_nagle_algorithm = True
+    delay = 0.5        # Seconds before the first byte, like model queueing + prefill
+    token_delay = 0.02  # Seconds between streamed tokens
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+
+        if body.get("stream"):
+            self._stream_answer(body)
+        else:
+            self._send_answer(body)
+
+    def _send_answer(self, body):
+        payload = json.dumps({
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": MOCK_ANSWER},
+                "finish_reason": "stop"
+            }]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream_answer(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        for word in MOCK_ANSWER.split(" "):
+            chunk = {
+                "id": "mock-completion",
+                "object": "chat.completion.chunk",
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.token_delay)
+
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    # Load tests open hundreds of connections at once; the default backlog of 5 drops them
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def run(port=8001, delay=0.5, token_delay=0.02):
+    MockLLMHandler.delay = delay
+    MockLLMHandler.token_delay = token_delay
+    server = MockLLMServer(("127.0.0.1", port), MockLLMHandler)
+    print(f"🤖 Mock LLM listening on http://127.0.0.1:{port}/openai/v1/chat/completions")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    run(args.port, args.delay, args.token_delay).serve_forever()
@@ -0,0 +1,88 @@
+"""Production entry point: gunicorn with several worker processes, each serving requests on a thread pool
+
+The app and the embedding model weights are loaded once in the master process
+before forking, so workers share them copy-on-write instead of each loading
+their own. Configure with environment variables:
+
+    WEB_BIND     address to listen on (default 0.0.0.0:5000)
+    WEB_WORKERS  worker processes (default: one per core with CHROMA_HOST, else 1)
+    WEB_THREADS  request threads per worker (default 8)
+    WEB_TIMEOUT  seconds before a stuck worker is restarted (default 120)
+
+More than one worker needs a Chroma server every worker can reach
+(CHROMA_HOST/CHROMA_PORT); with an in-process store each worker would see only its own uploads.
+"""
+import os
+
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "120"))
+
+
+def worker_count():
+    default = str(os.cpu_count() or 1) if os.getenv("CHROMA_HOST") else "1"
+    workers = int(os.getenv("WEB_WORKERS", default))
+    if workers > 1 and not os.getenv("CHROMA_HOST"):
+        print(f"⚠️ WEB_WORKERS={workers} needs a shared Chroma server (CHROMA_HOST); running 1 worker")
+        return 1
+    return workers
+
+
+def preload():
+    """Import the app and load model weights in the master so workers inherit them"""
+    import app as rag_app
+    from utils.ragPipeline import embedding_model
+    from utils.contextBuilder import get_tokenizer
+    # Only load weights here: running inference before the fork can leave torch's
+    # thread pools unusable in the children
+    embedding_model.load()
+    get_tokenizer()
+    return rag_app
+
+
+def post_fork(server, worker):
+    import app as rag_app
+    from utils.ragPipeline import reset_after_fork
+    # Restoring sessions in the master opened a Chroma client; workers must not share it
+    reset_after_fork()
+    rag_app.start_background_tasks()
+
+
+def run_gunicorn(workers):
+    from gunicorn.app.base import BaseApplication
+
+    class RagServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", WEB_BIND)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", WEB_THREADS)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", WEB_TIMEOUT)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            return preload().app
+
+    RagServer().run()
+
+
+def run_threaded():
+    """Fallback where gunicorn is unavailable (e.g. Windows): one process, many threads"""
+    from werkzeug.serving import run_simple
+    rag_app = preload()
+    rag_app.start_background_tasks()
+    host, _, port = WEB_BIND.rpartition(":")
+    run_simple(host or "0.0.0.0", int(port), rag_app.app, threaded=True, use_reloader=False)
+
+
+if __name__ == "__main__":
+    workers = worker_count()
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("⚠️ gunicorn is not installed; serving with the threaded werkzeug server")
+        run_threaded()
+    else:
+        print(f"🚀 Serving on {WEB_BIND} with {workers} workers x {WEB_THREADS} threads")
+        run_gunicorn(workers)
@@ -0,0 +1,32 @@
+import json
+import time
+import requests
+
+def test_query_batch():
+    # Test batch query endpoint (run the backend against mock_llm_server.py for a quick check)
+    url = "http://localhost:5000/query/batch"
+    queries = [
+        "What are the main topics covered in the documents?",
+        "Summarize the first section.",
+        "Which dates are mentioned?",
+    ]
+
+    print(f"🔍 Sending {len(queries)} queries")
+    start = time.time()
+
+    with requests.post(url, json={"queries": queries}, stream=True) as response:
+        print(f"📊 Response status: {response.status_code}")
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            item = json.loads(line)
+            elapsed = time.time() - start
+            if "error" in item:
+                print(f"❌ [{item['index']}] after {elapsed:.3f}s: {item['error']}")
+            else:
+                print(f"📨 [{item['index']}] after {elapsed:.3f}s: {item['answer']}")
+
+    print(f"⏱️ Total time: {time.time() - start:.3f}s")
+
+if __name__ == "__main__":
+    test_query_batch()
@@ -0,0 +1,28 @@
+import requests
+import time
+
+def test_query_stream():
+    # Test streaming query endpoint (run the backend against mock_llm_server.py for a quick check)
+    url = "http://localhost:5000/query/stream"
+    query = "What are the main topics covered in the documents?"
+
+    print(f"🔍 Streaming query: {query}")
+    start = time.time()
+    first_byte = None
+
+    with requests.post(url, json={"query": query}, stream=True) as response:
+        print(f"📊 Response status: {response.status_code}")
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if first_byte is None:
+                first_byte = time.time() - start
+                print(f"⏱️ Time to first byte: {first_byte:.3f}s")
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                print(f"📨 {event}: {line[len('data:'):].strip()}")
+
+    print(f"⏱️ Total time: {time.time() - start:.3f}s")
+
+if __name__ == "__main__":
+    test_query_stream()
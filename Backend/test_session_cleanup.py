@@ -24,10 +24,22 @@ def test_session_cleanup():
         response = session.post(f"{base_url}/upload", files=files)
     
     print(f"📊 Upload status: {response.status_code}")
-    if response.status_code == 200:
-        data = response.json()
-        session_id = data.get('session_id')
-        print(f"✅ Session created: {session_id}")
+    if response.status_code != 202:
+        print(f"❌ Upload failed: {response.text}")
+        return
+    data = response.json()
+    session_id = data.get('session_id')
+    print(f"✅ Session created: {session_id}")
+    
+    # Step 1b: Wait for the ingestion job to finish
+    print("\n⏳ Step 1b: Poll ingestion job")
+    job_url = f"{base_url}{data['status_url']}"
+    for _ in range(120):
+        job = session.get(job_url).json()
+        print(f"📊 Job status: {job['status']} {[f['stage'] for f in job['files']]}")
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
     
     # Step 2: Check files exist
     print("\n📁 Step 2: Check files exist")
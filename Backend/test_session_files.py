@@ -1,5 +1,6 @@
 import requests
 import os
+import time
 
 def test_session_file_management():
     base_url = "http://localhost:5000"
@@ -19,15 +20,26 @@ def test_session_file_management():
             response = session.post(f"{base_url}/upload", files=files)
         
         print(f"📊 Upload response: {response.status_code}")
-        if response.status_code == 200:
+        if response.status_code == 202:
             data = response.json()
-            print(f"✅ Upload successful! Session ID: {data.get('session_id', 'N/A')}")
+            print(f"✅ Upload accepted! Session ID: {data.get('session_id', 'N/A')}")
         else:
             print(f"❌ Upload failed: {response.text}")
+            return
     else:
         print(f"❌ Test file not found: {test_file_path}")
         return
     
+    # Test 1b: Wait for the ingestion job to finish
+    print("\n⏳ Test 1b: Poll ingestion job")
+    job_url = f"{base_url}{data['status_url']}"
+    for _ in range(120):
+        job = session.get(job_url).json()
+        print(f"📊 Job status: {job['status']} {[f['stage'] for f in job['files']]}")
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
+    
     # Test 2: Check files in session
     print("\n📋 Test 2: Check files in session")
     response = session.get(f"{base_url}/files")
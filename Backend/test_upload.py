@@ -1,5 +1,6 @@
 import requests
 import os
+import time
 
 def test_file_upload():
     # Test file upload
@@ -14,17 +15,31 @@ def test_file_upload():
     
     print(f"📤 Testing upload with file: {test_file_path}")
     
+    session = requests.Session()
     with open(test_file_path, 'rb') as f:
         files = {'file': f}
-        response = requests.post(url, files=files)
+        response = session.post(url, files=files)
     
     print(f"📊 Response status: {response.status_code}")
     print(f"📊 Response body: {response.text}")
     
-    if response.status_code == 200:
+    if response.status_code != 202:
+        print("❌ Upload failed!")
+        return
+    
+    # Ingestion runs in the background; wait for the job to finish
+    job_url = f"http://localhost:5000{response.json()['status_url']}"
+    for _ in range(120):
+        job = session.get(job_url).json()
+        print(f"📊 Job status: {job['status']} {[f['stage'] for f in job['files']]}")
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
+    
+    if job["status"] == "completed":
         print("✅ Upload successful!")
     else:
-        print("❌ Upload failed!")
+        print(f"❌ Upload failed! Job status: {job['status']}")
 
 if __name__ == "__main__":
     test_file_upload()
@@ -1,5 +1,6 @@
 import requests
 import os
+import time
 
 def test_upload_and_query():
     """Test the complete upload and query flow"""
@@ -32,7 +33,7 @@ def test_upload_and_query():
         print(f"📊 Upload status: {response.status_code}")
         print(f"📊 Upload response: {response.text}")
         
-        if response.status_code != 200:
+        if response.status_code != 202:
             print("❌ Upload failed, stopping test")
             return
             
@@ -40,6 +41,16 @@ def test_upload_and_query():
         print(f"❌ Upload error: {e}")
         return
     
+    # Test 1b: Wait for the ingestion job to finish
+    print("\n⏳ Step 1b: Poll ingestion job")
+    job_url = f"{base_url}{response.json()['status_url']}"
+    for _ in range(120):
+        job = session.get(job_url).json()
+        print(f"📊 Job status: {job['status']} {[f['stage'] for f in job['files']]}")
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
+    
     # Test 2: Check ChromaDB status
     print("\n🔍 Step 2: Check ChromaDB status")
     try:
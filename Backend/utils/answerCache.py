@@ -0,0 +1,128 @@
+import os
+import re
+import math
+import time
+import threading
+from collections import OrderedDict
+
+# Two-tier cache of generated answers: exact (normalized query) and semantic (query embedding)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """LRU + TTL answer cache scoped to a session collection and its version
+
+    Entries are only reused when the retrieved chunk ids match exactly, so a
+    hit always answers from the same context the LLM would have seen. Any
+    write to the collection bumps its version, which invalidates its entries.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL_SECONDS,
+                 similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # (session, version, query, chunk ids) -> entry
+        self._by_context = {}          # (session, version, chunk ids) -> set of entry keys
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, session_id, version, query, query_vector, chunk_ids):
+        """Return (answer, context stats) cached for this query and retrieved context, or None"""
+        context = (session_id, version, tuple(chunk_ids))
+        key = context + (normalize_query(query),)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created_at"] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"], dict(entry["stats"])
+
+            best_key, best_score = None, self.similarity
+            for candidate in list(self._by_context.get(context, ())):
+                candidate_entry = self._entries[candidate]
+                if now - candidate_entry["created_at"] > self.ttl:
+                    self._remove_locked(candidate)
+                    continue
+                score = cosine_similarity(query_vector, candidate_entry["vector"])
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                best_entry = self._entries[best_key]
+                return best_entry["answer"], dict(best_entry["stats"])
+
+            self.misses += 1
+            return None
+
+    def store(self, session_id, version, query, query_vector, chunk_ids, answer, stats=None):
+        """Cache an answer with the context stats (prompt_tokens etc.) it was generated with"""
+        context = (session_id, version, tuple(chunk_ids))
+        key = context + (normalize_query(query),)
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = {
+                "answer": answer,
+                "stats": dict(stats or {}),
+                "vector": list(query_vector),
+                "created_at": time.time(),
+            }
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self.evictions += 1
+
+    def invalidate(self, session_id):
+        """Forget every answer generated from a session's collection"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                self._remove_locked(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def _remove_locked(self, key):
+        self._entries.pop(key, None)
+        context = key[:3]
+        keys = self._by_context.get(context)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_context[context]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity_threshold": self.similarity,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
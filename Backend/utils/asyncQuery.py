@@ -0,0 +1,68 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.ragPipeline import plan_answer, plan_stream, acall_groq_llama, astream_groq_llama
+from utils.logger import get_logger
+from utils.metrics import span
+
+logger = get_logger("asyncQuery")
+
+# Embedding, search and prompt assembly are blocking, so the async path runs them here
+# and only awaits the LLM; a few threads serve many in-flight queries
+RETRIEVAL_THREADS = int(os.getenv("RETRIEVAL_THREADS", "16"))
+
+_retrieval_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_THREADS, thread_name_prefix="retrieval")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the retrieval pool without stalling the event loop
+
+    The caller's context goes along, so log lines keep the request's trace id.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_retrieval_pool, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def answer_query_async(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Async answer_query(): same retrieval and caching, the LLM call is awaited"""
+    result, prompt, cache_store = await run_blocking(plan_answer, query, session_id, k, use_rerank, candidates)
+    if prompt is None:
+        return result
+
+    try:
+        with span("llm"):
+            response = (await acall_groq_llama(prompt)).strip()
+        cache_store(response)
+        return {"answer": response, **result}
+    except Exception as e:
+        return {"answer": f"❌ Error calling Groq API: {str(e)}", **result}
+
+
+async def stream_query_async(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Async stream_query_with_rag(): yields the same (event, data) pairs"""
+    events, prompt, context_info, cache_store = await run_blocking(
+        plan_stream, query, session_id, k, use_rerank, candidates
+    )
+    for event in events:
+        yield event
+    if prompt is None:
+        return
+
+    try:
+        tokens = []
+        with span("llm_stream"):
+            async for token in astream_groq_llama(prompt):
+                tokens.append(token)
+                yield "token", {"token": token}
+        cache_store("".join(tokens).strip())
+        yield "done", context_info
+    except Exception as e:
+        logger.error("🔥 Groq API streaming error: %s", e)
+        yield "error", {"error": f"❌ Error calling Groq API: {str(e)}"}
+
+
+def shutdown_retrieval_pool():
+    _retrieval_pool.shutdown(wait=False, cancel_futures=True)
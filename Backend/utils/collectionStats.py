@@ -0,0 +1,70 @@
+import os
+import threading
+
+
+class CollectionStats:
+    """Chunk counts per session collection and per source file, kept current on every write
+
+    Counts are set per (session, source) rather than incremented, so
+    re-upserting the same file never double counts. Reading them never
+    touches row data in Chroma.
+    """
+
+    def __init__(self):
+        self._sessions = {}  # session id -> {source key -> {"name": ..., "file_hash": ..., "chunks": n}}
+        self._totals = {}    # session id -> chunk count
+        self._lock = threading.Lock()
+
+    def set_file_count(self, session_id, key, name, chunks, file_hash=None):
+        """Record a source's chunk count under the name it was uploaded as"""
+        with self._lock:
+            files = self._sessions.setdefault(session_id, {})
+            previous = files.get(key, {}).get("chunks", 0)
+            files[key] = {"name": name, "file_hash": file_hash or key, "chunks": chunks}
+            self._totals[session_id] = self._totals.get(session_id, 0) + chunks - previous
+
+    def remove_file(self, session_id, key):
+        with self._lock:
+            entry = self._sessions.get(session_id, {}).pop(key, None)
+            if entry is not None:
+                self._totals[session_id] -= entry["chunks"]
+
+    def drop_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._totals.pop(session_id, None)
+
+    def reset(self):
+        with self._lock:
+            self._sessions.clear()
+            self._totals.clear()
+
+    def load_manifest(self, manifest):
+        """Seed counts from a file manifest ({session: {source id: {"source", "source_name", "file_hash", "chunk_ids"}}})"""
+        for session_id, entries in manifest.items():
+            for key, entry in entries.items():
+                # Manifests written before source names were tracked only have the saved path
+                name = entry.get("source_name") or os.path.basename(entry["source"])
+                self.set_file_count(session_id, key, name, len(entry["chunk_ids"]), entry.get("file_hash", key))
+
+    def session_total(self, session_id):
+        with self._lock:
+            return self._totals.get(session_id, 0)
+
+    def session_stats(self, session_id):
+        with self._lock:
+            files = self._sessions.get(session_id, {})
+            return {
+                "total_documents": self._totals.get(session_id, 0),
+                "sources": [
+                    {"name": entry["name"], "file_hash": entry["file_hash"], "chunks": entry["chunks"]}
+                    for entry in files.values()
+                ],
+            }
+
+    def totals(self):
+        with self._lock:
+            return {
+                "collections": len(self._totals),
+                "total_documents": sum(self._totals.values()),
+            }
@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+
+# Prompt context is packed up to this many tokens, counted with a local tokenizer
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+# Passages whose word shingles overlap at least this much are treated as duplicates
+DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.8"))
+SHINGLE_SIZE = 5
+# The splitter strips the separator between neighbouring chunks, so allow a small gap
+ADJACENT_GAP = 2
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def get_tokenizer():
+    """Load the HuggingFace tokenizer once; False when it is unavailable offline"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(CONTEXT_TOKENIZER)
+            except Exception as e:
+                print(f"⚠️ Tokenizer {CONTEXT_TOKENIZER} unavailable ({e}), estimating token counts")
+                _tokenizer = False
+        return _tokenizer
+
+
+def count_tokens(text):
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return len(_FALLBACK_TOKEN.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        ids = tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+        return tokenizer.decode(ids)
+    matches = list(_FALLBACK_TOKEN.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+    return text[:matches[max_tokens].start()].rstrip()
+
+
+def merge_overlapping(docs):
+    """Merge chunks from the same source and page whose character spans overlap or touch
+
+    Needs the splitter's "start_index" metadata; chunks without it pass through
+    untouched. Returns passages as dicts with "text", "rank" (best rank of the
+    merged chunks), "chunk_ids" and "metadata", in rank order.
+    """
+    passages = []
+    groups = {}
+    for rank, doc in enumerate(docs):
+        passage = {
+            "text": doc.page_content,
+            "rank": rank,
+            "chunk_ids": [doc.metadata.get("chunk_id")],
+            "metadata": doc.metadata,
+            "start": doc.metadata.get("start_index"),
+        }
+        if passage["start"] is None or passage["start"] < 0:
+            passages.append(passage)
+        else:
+            key = (doc.metadata.get("source"), doc.metadata.get("page"))
+            groups.setdefault(key, []).append(passage)
+
+    for group in groups.values():
+        group.sort(key=lambda passage: passage["start"])
+        current = group[0]
+        current_end = current["start"] + len(current["text"])
+        for passage in group[1:]:
+            passage_end = passage["start"] + len(passage["text"])
+            if passage["start"] <= current_end + ADJACENT_GAP:
+                if passage["start"] > current_end:
+                    current["text"] += "\n"
+                    current_end = passage["start"]
+                current["text"] += passage["text"][current_end - passage["start"]:]
+                current_end = max(current_end, passage_end)
+                current["rank"] = min(current["rank"], passage["rank"])
+                current["chunk_ids"] += passage["chunk_ids"]
+            else:
+                passages.append(current)
+                current, current_end = passage, passage_end
+        passages.append(current)
+
+    return sorted(passages, key=lambda passage: passage["rank"])
+
+
+def shingles(text):
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def drop_near_duplicates(passages):
+    """Keep the best-ranked copy of passages whose shingle Jaccard similarity is too high"""
+    kept = []
+    for passage in passages:
+        passage_shingles = shingles(passage["text"])
+        duplicate = False
+        for other in kept:
+            union = len(passage_shingles | other["shingles"])
+            if union and len(passage_shingles & other["shingles"]) / union >= DUPLICATE_SIMILARITY:
+                duplicate = True
+                break
+        if not duplicate:
+            passage["shingles"] = passage_shingles
+            kept.append(passage)
+    return kept
+
+
+def build_context(docs, token_budget=None):
+    """Merge, dedupe and pack retrieved chunks best first until the token budget is used
+
+    Returns (context text, stats) where stats counts the tokens, passages and
+    chunks that made it in.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    merged = merge_overlapping(docs)
+    passages = drop_near_duplicates(merged)
+
+    packed = []
+    used_tokens = 0
+    for passage in passages:
+        tokens = count_tokens(passage["text"])
+        if used_tokens + tokens <= budget:
+            packed.append(passage["text"])
+            used_tokens += tokens
+        elif not packed:
+            # Never send an empty context because the best passage alone is too long
+            packed.append(truncate_to_tokens(passage["text"], budget))
+            used_tokens += count_tokens(packed[-1])
+
+    return "\n\n".join(packed), {
+        "context_tokens": used_tokens,
+        "token_budget": budget,
+        "chunks_retrieved": len(docs),
+        "chunks_merged": len(docs) - len(merged),
+        "duplicates_dropped": len(merged) - len(passages),
+        "passages_used": len(packed),
+    }
@@ -0,0 +1,158 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from utils.logger import get_logger
+
+# Persistent cache of chunk embeddings keyed by (embedding model, chunk text hash)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+logger = get_logger("embeddingCache")
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embeddings stored in SQLite"""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn_pid = None
+        self._conn_handle = None
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        # Entry count shared by every process using this file, updated in the same
+        # transaction as each insert and eviction
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO cache_meta (name, value) SELECT 'entries', COUNT(*) FROM embeddings"
+        )
+        self._conn.commit()
+
+    @property
+    def _conn(self):
+        # Server workers forked after import must not share the parent's connection
+        if self._conn_pid != os.getpid():
+            self._conn_handle = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn_handle.execute("PRAGMA journal_mode=WAL")
+            self._conn_handle.execute("PRAGMA synchronous=NORMAL")
+            self._conn_pid = os.getpid()
+        return self._conn_handle
+
+    @staticmethod
+    def make_key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name, texts):
+        """Return a list aligned with `texts` holding cached vectors or None"""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model_name, texts, vectors):
+        """Store freshly computed vectors, evicting least recently used entries if needed"""
+        now = time.time()
+        rows = [
+            (self.make_key(model_name, text), model_name, array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            # The insert takes SQLite's write lock, so the count read below is exact
+            # even with other worker processes writing to the same file
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._adjust_size_locked(self._conn.total_changes - before)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _adjust_size_locked(self, delta):
+        if delta:
+            self._conn.execute("UPDATE cache_meta SET value = value + ? WHERE name = 'entries'", (delta,))
+
+    def _size_locked(self):
+        return self._conn.execute("SELECT value FROM cache_meta WHERE name = 'entries'").fetchone()[0]
+
+    def _evict_locked(self):
+        overflow = self._size_locked() - self.max_entries
+        if overflow <= 0:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        ).rowcount
+        self._adjust_size_locked(-deleted)
+        self.evictions += deleted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._size_locked(),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def embed_with_cache(cache, embedder, model_name, texts):
+    """Embed `texts`, only running the model on chunks the cache has not seen
+
+    `embedder` is anything with embed_documents, e.g. the shared EmbeddingService.
+    """
+    vectors = cache.get_many(model_name, texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        # Identical chunks inside one batch only need one forward pass
+        unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+        computed = embedder.embed_documents(unique_texts)
+        by_text = dict(zip(unique_texts, computed))
+        for i in missing:
+            vectors[i] = by_text[texts[i]]
+        cache.put_many(model_name, unique_texts, computed)
+    logger.debug("🧠 Embedding cache: %d hits, %d misses", len(texts) - len(missing), len(missing))
+    return vectors
@@ -0,0 +1,187 @@
+import os
+import time
+import queue
+import itertools
+import threading
+
+# One in-process embedding worker shared by uploads and queries
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = leave torch's default
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+# How many queued texts are pulled at once and sorted by length before batching
+EMBEDDING_SORT_WINDOW = EMBEDDING_BATCH_SIZE * 4
+
+QUERY_PRIORITY = 0
+DOCUMENT_PRIORITY = 1
+
+
+class LazyEmbeddings:
+    """HuggingFace embeddings that load the model the first time they are used
+
+    Importing sentence-transformers/torch and loading the weights takes
+    seconds, so it happens on the first embed (or an explicit load() from a
+    warmup hook) instead of when the module is imported.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.load_seconds = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def _client(self):
+        # Read by EmbeddingService for token lengths; None until the model is loaded
+        return self._model._client if self._model is not None else None
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                started = time.perf_counter()
+                self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+                self.load_seconds = time.perf_counter() - started
+                print(f"🧠 Loaded embedding model {self.model_name} in {self.load_seconds:.2f}s")
+            return self._model
+
+    def embed_documents(self, texts):
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.load().embed_query(text)
+
+
+class _EmbeddingRequest:
+    """One caller's texts, filled in by the worker as its batches complete"""
+
+    def __init__(self, count):
+        self.vectors = [None] * count
+        self.remaining = count
+        self.error = None
+        self.done = threading.Event()
+        if count == 0:
+            self.done.set()
+
+
+class EmbeddingService:
+    """Coalesce embedding work from concurrent callers into fixed-size, length-sorted batches
+
+    Exposes embed_documents/embed_query so it can stand in for the LangChain
+    embeddings object. Queries are queued ahead of document chunks so a large
+    upload does not delay interactive searches.
+    """
+
+    def __init__(self, embedding_model, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS,
+                 max_wait_ms=EMBEDDING_MAX_WAIT_MS):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.threads = threads
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.busy_seconds = 0.0
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), DOCUMENT_PRIORITY)
+
+    def embed_query(self, text):
+        return self._embed([text], QUERY_PRIORITY)[0]
+
+    def embed_queries(self, texts):
+        """Embed several queries in one request, still ahead of queued document chunks"""
+        return self._embed(list(texts), QUERY_PRIORITY)
+
+    def _embed(self, texts, priority):
+        self._ensure_worker()
+        request = _EmbeddingRequest(len(texts))
+        for index, text in enumerate(texts):
+            self._queue.put((priority, next(self._sequence), text, request, index))
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+                self._worker.start()
+
+    def _token_length(self, text):
+        tokenizer = getattr(getattr(self.embedding_model, "_client", None), "tokenizer", None)
+        if tokenizer is not None:
+            try:
+                return len(tokenizer.tokenize(text))
+            except Exception:
+                pass
+        return len(text)
+
+    def _collect(self):
+        """Block for the first item, then gather whatever else arrives within max_wait"""
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < EMBEDDING_SORT_WINDOW:
+            timeout = deadline - time.perf_counter()
+            try:
+                items.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        if self.threads > 0:
+            try:
+                import torch
+                torch.set_num_threads(self.threads)
+            except ImportError:
+                pass
+
+        while True:
+            items = self._collect()
+            # Queries first, then similar lengths together so padding is minimal
+            items.sort(key=lambda item: (item[0], self._token_length(item[2])))
+            for start in range(0, len(items), self.batch_size):
+                self._run_batch(items[start:start + self.batch_size])
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        try:
+            vectors = self.embedding_model.embed_documents([item[2] for item in batch])
+            error = None
+        except Exception as e:
+            vectors, error = None, e
+
+        with self._stats_lock:
+            self.batches += 1
+            self.texts += len(batch)
+            self.busy_seconds += time.perf_counter() - started
+
+        for position, (_, _, _, request, index) in enumerate(batch):
+            if error is not None:
+                request.error = error
+            else:
+                request.vectors[index] = vectors[position]
+            request.remaining -= 1
+            if request.remaining == 0:
+                request.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batch_size": self.batch_size,
+                "torch_threads": self.threads or None,
+                "queued_texts": self._queue.qsize(),
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
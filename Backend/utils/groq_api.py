@@ -1,34 +1,11 @@
-import os
-import requests
-from dotenv import load_dotenv
+from utils.llmClient import llm_client
 
-load_dotenv()
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
 
 def query_groq(prompt: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    body = {
-        "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful AI assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 1024
-    }
-
-    response = requests.post(GROQ_API_URL, headers=headers, json=body)
-
-    if response.status_code != 200:
-        raise Exception(f"GROQ API Error {response.status_code}: {response.text}")
-
-    result = response.json()
-    return result['choices'][0]['message']['content']
+    messages = [
+        {"role": "system", "content": "You are a helpful AI assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    return llm_client.chat(messages, GROQ_MODEL, temperature=0.7, max_tokens=1024)
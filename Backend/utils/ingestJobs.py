@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.ragPipeline import process_with_rag_pipeline, shared_state
+from utils.processFiles import shutdown_loader_pool
+from utils.logger import get_logger, trace_id_var, set_trace_id
+
+# Bounded background pool for ingestion so /upload can return immediately
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "32"))
+JOB_RETENTION_SECONDS = 3600  # Finished jobs are kept around for polling for 1 hour
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_job_slots = threading.BoundedSemaphore(MAX_PENDING_JOBS)
+# Jobs run in the worker process that accepted the upload; every change is mirrored to
+# shared_state so /jobs/<id> can be answered by any worker
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+logger = get_logger("ingestJobs")
+
+
+class JobQueueFull(Exception):
+    """Raised when too many ingestion jobs are already queued or running"""
+
+
+def submit_ingest_job(session_id, files):
+    """Queue an ingestion job for already-saved files and return its job id
+
+    `files` is a list of dicts with "original_name", "saved_path" and
+    "file_hash" keys, the same shape that app.py tracks in session_files.
+    """
+    if not _job_slots.acquire(blocking=False):
+        raise JobQueueFull(f"Too many ingestion jobs in progress (limit {MAX_PENDING_JOBS})")
+
+    prune_finished_jobs()
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "session_id": session_id,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "files": {
+            f["saved_path"]: {"name": f["original_name"], "stage": "queued"}
+            for f in files
+        },
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        _publish_job_locked(job_id)
+
+    try:
+        file_hashes = {f["saved_path"]: f.get("file_hash") for f in files}
+        # The upload name identifies the document, so a re-upload replaces its earlier revision
+        source_names = {f["saved_path"]: f["original_name"] for f in files}
+        # The job logs under the trace id of the upload request that queued it
+        _executor.submit(_run_job, job_id, [f["saved_path"] for f in files], file_hashes, source_names,
+                         trace_id_var.get())
+    except Exception:
+        with _jobs_lock:
+            del _jobs[job_id]
+        _job_slots.release()
+        raise
+
+    logger.info("📥 Queued ingestion job %s with %d files", job_id, len(files))
+    return job_id
+
+
+def _snapshot_locked(job_id):
+    job = _jobs[job_id]
+    snapshot = dict(job)
+    snapshot["files"] = [dict(info) for info in job["files"].values()]
+    return snapshot
+
+
+def _publish_job_locked(job_id):
+    try:
+        shared_state.save_job(_snapshot_locked(job_id))
+    except Exception as e:
+        logger.warning("⚠️ Could not publish status of job %s: %s", job_id, e)
+
+
+def get_job(job_id):
+    """Return a snapshot of a job's status, or None if it is unknown
+
+    Jobs started by another worker process are read from shared_state.
+    """
+    with _jobs_lock:
+        if job_id in _jobs:
+            return _snapshot_locked(job_id)
+    return shared_state.load_job(job_id)
+
+
+def prune_finished_jobs():
+    """Forget jobs that finished more than JOB_RETENTION_SECONDS ago"""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        expired = [
+            job_id for job_id, job in _jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del _jobs[job_id]
+    shared_state.prune_jobs(cutoff)
+
+
+def shutdown_ingest_jobs():
+    """Stop accepting jobs and drop anything that has not started yet"""
+    _executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_loader_pool()
+
+
+def _update_job(job_id, **fields):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+            _publish_job_locked(job_id)
+
+
+def _job_progress(job_id):
+    """Build the progress callback handed to the RAG pipeline"""
+    def progress(file_path, stage, **details):
+        with _jobs_lock:
+            job = _jobs.get(job_id)
+            if job is None or file_path not in job["files"]:
+                return
+            file_info = job["files"][file_path]
+            file_info["stage"] = stage
+            file_info.update(details)
+            _publish_job_locked(job_id)
+    return progress
+
+
+def _run_job(job_id, file_paths, file_hashes, source_names=None, trace_id=None):
+    set_trace_id(trace_id if trace_id and trace_id != "-" else job_id)
+    try:
+        _update_job(job_id, status="running", started_at=time.time())
+        logger.info("🚀 Starting ingestion job %s with %d files", job_id, len(file_paths))
+        with _jobs_lock:
+            session_id = _jobs[job_id]["session_id"]
+        result = process_with_rag_pipeline(
+            file_paths, session_id, progress=_job_progress(job_id), file_hashes=file_hashes,
+            source_names=source_names
+        )
+        logger.info("✅ Ingestion job %s result: %s", job_id, result)
+        _update_job(job_id, status="completed" if result else "failed", finished_at=time.time())
+    except Exception as e:
+        logger.exception("❌ Ingestion job %s crashed: %s", job_id, e)
+        _update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+    finally:
+        _job_slots.release()
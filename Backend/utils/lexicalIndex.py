@@ -0,0 +1,158 @@
+import re
+import math
+import heapq
+import threading
+from array import array
+
+# Keep identifiers such as part numbers (XJ-900), error codes (E_1042) and versions (v2.3) intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+RRF_K = 60
+# Tombstoned share of documents at which the postings are rebuilt without them
+COMPACT_RATIO = 0.25
+
+
+def tokenize(text):
+    """Lowercase word tokens; compound identifiers also index their parts"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if any(sep in token for sep in "-_."):
+            tokens.extend(part for part in re.split(r"[-_.]", token) if part)
+    return tokens
+
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """Fuse ranked lists of ids; returns [(id, score)] best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """Incremental in-memory BM25 index over one collection's chunks
+
+    Postings are array-backed: for each term a pair of arrays holding the
+    internal document numbers and term frequencies. Removed chunks are
+    tombstoned and leave the document frequencies at once; the postings are
+    compacted once tombstones pass COMPACT_RATIO of all documents, so
+    re-ingesting revisions does not grow the index without bound.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids = {}
+        self._postings = []             # term id -> (array of doc numbers, array of term frequencies)
+        self._document_frequencies = array("I")  # term id -> live documents containing it
+        self._chunk_ids = []            # doc number -> chunk id
+        self._doc_numbers = {}          # chunk id -> doc number
+        self._doc_lengths = array("I")
+        self._doc_terms = []            # doc number -> array of its term ids
+        self._deleted = set()
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._chunk_ids) - len(self._deleted)
+
+    def add(self, chunk_ids, texts):
+        """Index new chunks; ids that are already indexed are skipped, matching Chroma upserts"""
+        with self._lock:
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in self._doc_numbers and self._doc_numbers[chunk_id] not in self._deleted:
+                    continue
+                doc_number = len(self._chunk_ids)
+                self._chunk_ids.append(chunk_id)
+                self._doc_numbers[chunk_id] = doc_number
+
+                frequencies = {}
+                for token in tokenize(text):
+                    frequencies[token] = frequencies.get(token, 0) + 1
+                length = sum(frequencies.values())
+                self._doc_lengths.append(length)
+                self._total_length += length
+
+                terms = array("I")
+                for token, frequency in frequencies.items():
+                    term_id = self._term_ids.get(token)
+                    if term_id is None:
+                        term_id = len(self._postings)
+                        self._term_ids[token] = term_id
+                        self._postings.append((array("I"), array("I")))
+                        self._document_frequencies.append(0)
+                    doc_numbers, term_frequencies = self._postings[term_id]
+                    doc_numbers.append(doc_number)
+                    term_frequencies.append(frequency)
+                    self._document_frequencies[term_id] += 1
+                    terms.append(term_id)
+                self._doc_terms.append(terms)
+
+    def remove(self, chunk_ids):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                doc_number = self._doc_numbers.pop(chunk_id, None)
+                if doc_number is not None and doc_number not in self._deleted:
+                    self._deleted.add(doc_number)
+                    self._total_length -= self._doc_lengths[doc_number]
+                    for term_id in self._doc_terms[doc_number]:
+                        self._document_frequencies[term_id] -= 1
+            if len(self._deleted) > COMPACT_RATIO * len(self._chunk_ids):
+                self._compact_locked()
+
+    def _compact_locked(self):
+        """Renumber the live documents and rebuild the postings without tombstones"""
+        renumbered = {}
+        chunk_ids, doc_lengths = [], array("I")
+        for doc_number, chunk_id in enumerate(self._chunk_ids):
+            if doc_number not in self._deleted:
+                renumbered[doc_number] = len(chunk_ids)
+                chunk_ids.append(chunk_id)
+                doc_lengths.append(self._doc_lengths[doc_number])
+
+        term_ids, postings, document_frequencies, new_term_of = {}, [], array("I"), {}
+        for token, term_id in self._term_ids.items():
+            doc_numbers, term_frequencies = self._postings[term_id]
+            kept_docs, kept_frequencies = array("I"), array("I")
+            for doc_number, frequency in zip(doc_numbers, term_frequencies):
+                if doc_number in renumbered:
+                    kept_docs.append(renumbered[doc_number])
+                    kept_frequencies.append(frequency)
+            if kept_docs:
+                new_term_of[term_id] = len(postings)
+                term_ids[token] = len(postings)
+                postings.append((kept_docs, kept_frequencies))
+                document_frequencies.append(len(kept_docs))
+
+        self._doc_terms = [
+            array("I", (new_term_of[term_id] for term_id in self._doc_terms[doc_number]))
+            for doc_number in renumbered
+        ]
+        self._term_ids, self._postings, self._document_frequencies = term_ids, postings, document_frequencies
+        self._chunk_ids, self._doc_lengths = chunk_ids, doc_lengths
+        self._doc_numbers = {chunk_id: doc_number for doc_number, chunk_id in enumerate(chunk_ids)}
+        self._deleted = set()
+
+    def search(self, query, k=10):
+        """Return up to k (chunk id, BM25 score) pairs, best first"""
+        with self._lock:
+            live_docs = len(self._chunk_ids) - len(self._deleted)
+            if not live_docs:
+                return []
+            average_length = self._total_length / live_docs
+            scores = {}
+            for token in set(tokenize(query)):
+                term_id = self._term_ids.get(token)
+                if term_id is None or not self._document_frequencies[term_id]:
+                    continue
+                doc_numbers, term_frequencies = self._postings[term_id]
+                document_frequency = self._document_frequencies[term_id]
+                idf = math.log(1 + (live_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+                for doc_number, frequency in zip(doc_numbers, term_frequencies):
+                    if doc_number in self._deleted:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_number] / average_length)
+                    scores[doc_number] = scores.get(doc_number, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._chunk_ids[doc_number], score) for doc_number, score in best]
@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import random
+import bisect
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger("llmClient")
+
+# Shared client for the OpenAI-compatible chat completions endpoint (Groq by default)
+LLM_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Awaiting requests hold no thread, so the async path can keep far more in flight
+LLM_ASYNC_MAX_CONCURRENCY = int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY", "256"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+
+class LLMError(Exception):
+    """Raised when the LLM backend keeps failing after all retries"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram, in seconds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        with self._lock:
+            if not self.count:
+                return None
+            target = q * self.count
+            seen = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += bucket_count
+                if seen >= target:
+                    return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = []
+            seen = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += bucket_count
+                cumulative.append({"le": "+Inf" if bound == float("inf") else bound, "count": seen})
+            count, total = self.count, self.total
+        return {
+            "count": count,
+            "sum_seconds": round(total, 4),
+            "mean_seconds": round(total / count, 4) if count else None,
+            "p50_le": self.quantile(0.5),
+            "p95_le": self.quantile(0.95),
+            "buckets": cumulative,
+        }
+
+
+class LLMClient:
+    """Pooled keep-alive HTTP client with timeouts, jittered retries and a concurrency cap"""
+
+    def __init__(self, api_url=LLM_API_URL, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.api_url = api_url
+        self.timeout = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # The aiohttp session and its semaphore belong to one event loop; created on first async call
+        self._async_client = None
+        self._async_slots = None
+        self._async_loop = None
+
+        self.latency = LatencyHistogram()
+        self.time_to_first_token = LatencyHistogram()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._stats_lock = threading.Lock()
+
+    def _headers(self, stream=False):
+        headers = {
+            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
+            "Content-Type": "application/json"
+        }
+        if stream:
+            headers["Accept"] = "text/event-stream"
+        return headers
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _backoff(self, attempt, response=None):
+        """Exponential backoff with full jitter, honouring a numeric Retry-After"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    def _post(self, body, stream=False):
+        """POST with retries on connection errors, timeouts and 429/5xx responses"""
+        self._count("requests")
+        last_error = None
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            response = None
+            try:
+                response = self.session.post(
+                    self.api_url, headers=self._headers(stream), json=body,
+                    timeout=self.timeout, stream=stream
+                )
+                if response.status_code == 200:
+                    return response
+                last_error = LLMError(
+                    f"LLM API Error {response.status_code}: {response.text}", response.status_code
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = LLMError(f"LLM API request failed: {e}")
+
+            if attempt < LLM_MAX_RETRIES:
+                delay = self._backoff(attempt, response)
+                logger.warning("🔁 LLM request failed (%s), retrying in %.2fs", last_error, delay)
+                self._count("retries")
+                time.sleep(delay)
+
+        self._count("failures")
+        raise last_error
+
+    def chat(self, messages, model, **params):
+        """Return the full completion text for a list of chat messages"""
+        body = {"model": model, "messages": messages, **params}
+        with self._slots:
+            start = time.perf_counter()
+            response = self._post(body)
+            try:
+                content = response.json()["choices"][0]["message"]["content"]
+            finally:
+                response.close()
+            self.latency.observe(time.perf_counter() - start)
+        return content
+
+    def stream_chat(self, messages, model, **params):
+        """Yield completion tokens as the endpoint streams them back"""
+        body = {"model": model, "messages": messages, "stream": True, **params}
+        with self._slots:
+            start = time.perf_counter()
+            first_token = True
+            with self._post(body, stream=True) as response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        if first_token:
+                            self.time_to_first_token.observe(time.perf_counter() - start)
+                            first_token = False
+                        yield delta["content"]
+            self.latency.observe(time.perf_counter() - start)
+
+    def _async_state(self):
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            import aiohttp
+            self._async_client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=LLM_ASYNC_MAX_CONCURRENCY),
+                timeout=aiohttp.ClientTimeout(total=None, connect=LLM_CONNECT_TIMEOUT, sock_read=LLM_READ_TIMEOUT),
+            )
+            self._async_slots = asyncio.Semaphore(LLM_ASYNC_MAX_CONCURRENCY)
+            self._async_loop = loop
+        return self._async_client, self._async_slots
+
+    async def _apost(self, body, stream=False):
+        """Async twin of _post: same retries and backoff, awaited instead of blocking a thread"""
+        import aiohttp
+        client, _ = self._async_state()
+        self._count("requests")
+        last_error = None
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            response = None
+            try:
+                response = await client.post(self.api_url, headers=self._headers(stream), json=body)
+                if response.status == 200:
+                    return response
+                text = await response.text()
+                last_error = LLMError(f"LLM API Error {response.status}: {text}", response.status)
+                response.release()
+                if response.status not in RETRY_STATUSES:
+                    break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Timeouts carry no message of their own
+                last_error = LLMError(f"LLM API request failed: {str(e) or type(e).__name__}")
+
+            if attempt < LLM_MAX_RETRIES:
+                delay = self._backoff(attempt, response)
+                logger.warning("🔁 LLM request failed (%s), retrying in %.2fs", last_error, delay)
+                self._count("retries")
+                await asyncio.sleep(delay)
+
+        self._count("failures")
+        raise last_error
+
+    async def achat(self, messages, model, **params):
+        """Async chat(): awaits the completion without holding a thread"""
+        body = {"model": model, "messages": messages, **params}
+        _, slots = self._async_state()
+        async with slots:
+            start = time.perf_counter()
+            response = await self._apost(body)
+            try:
+                content = (await response.json(content_type=None))["choices"][0]["message"]["content"]
+            finally:
+                response.release()
+            self.latency.observe(time.perf_counter() - start)
+        return content
+
+    async def astream_chat(self, messages, model, **params):
+        """Async stream_chat(): yields completion tokens as they arrive"""
+        body = {"model": model, "messages": messages, "stream": True, **params}
+        _, slots = self._async_state()
+        async with slots:
+            start = time.perf_counter()
+            first_token = True
+            response = await self._apost(body, stream=True)
+            try:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        if first_token:
+                            self.time_to_first_token.observe(time.perf_counter() - start)
+                            first_token = False
+                        yield delta["content"]
+            finally:
+                response.release()
+            self.latency.observe(time.perf_counter() - start)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+
+    def stats(self):
+        with self._stats_lock:
+            counters = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+        return {
+            **counters,
+            "api_url": self.api_url,
+            "latency": self.latency.snapshot(),
+            "time_to_first_token": self.time_to_first_token.snapshot(),
+        }
+
+
+# One client per process so every caller shares the same connection pool
+llm_client = LLMClient()
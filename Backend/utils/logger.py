@@ -0,0 +1,43 @@
+import os
+import re
+import uuid
+import logging
+import contextvars
+
+# Leveled logging for the request and ingestion hot paths. Debug lines use lazy
+# %-formatting, so with LOG_LEVEL above DEBUG they cost one level check.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(message)s"
+
+# Trace id of the request (or ingestion job) being handled; "-" outside of one
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp every record with the current trace id"""
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+_root = logging.getLogger("rag")
+if not _root.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _handler.addFilter(TraceIdFilter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+def get_logger(name):
+    return _root.getChild(name)
+
+
+def set_trace_id(trace_id=None):
+    """Use the caller's id (e.g. an X-Request-ID header) or make one up; returns it"""
+    # Client-supplied ids end up in log lines, so only plain id characters are kept
+    trace_id = re.sub(r"[^A-Za-z0-9._:-]", "", trace_id or "")[:64] or uuid.uuid4().hex
+    trace_id_var.set(trace_id)
+    return trace_id
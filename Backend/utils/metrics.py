@@ -0,0 +1,174 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from utils.logger import get_logger
+
+# Prometheus-format counters and histograms, served at /metrics. Values are per
+# process; with several server workers each one reports its own.
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = get_logger("metrics")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in seconds"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        rows = []
+        for key, values in series.items():
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                seen += count
+                rows.append((f"{self.name}_bucket", key + (("le", format_value(bound)),), seen))
+            rows.append((f"{self.name}_count", key, seen))
+            rows.append((f"{self.name}_sum", key, round(values[-1], 6)))
+        return rows
+
+
+class MetricsRegistry:
+    """Owns the metrics and renders them in the Prometheus text format
+
+    Components that already keep their own counters (caches, the LLM client,
+    the session reaper) are exported through collectors: callables returning
+    (name, kind, help, samples) families at scrape time, where samples are
+    (sample name, labels, value) rows like Counter.samples() returns.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=STAGE_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        families = [(metric.name, metric.kind, metric.help, metric.samples()) for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning("⚠️ Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+
+        lines = []
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                if value is not None:
+                    lines.append(f"{sample_name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def value_samples(name, values):
+    """Samples for a counter or gauge family: `values` maps label tuples to numbers"""
+    return [(name, labels, value) for labels, value in values.items()]
+
+
+def latency_histogram_samples(name, snapshot):
+    """Samples for a llmClient.LatencyHistogram snapshot"""
+    rows = [
+        (f"{name}_bucket", (("le", format_value(float("inf") if b["le"] == "+Inf" else b["le"])),), b["count"])
+        for b in snapshot["buckets"]
+    ]
+    rows.append((f"{name}_count", (), snapshot["count"]))
+    rows.append((f"{name}_sum", (), snapshot["sum_seconds"]))
+    return rows
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "rag_stage_seconds", "Time spent in each pipeline stage", ("stage",)
+)
+http_requests = registry.counter(
+    "rag_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_seconds = registry.histogram(
+    "rag_http_request_seconds", "Time until the response headers were ready", ("route",)
+)
+
+
+def observe_stage(stage, seconds):
+    """Record a stage timed elsewhere, e.g. in a loader worker process"""
+    stage_seconds.observe(seconds, stage=stage)
+    logger.debug("⏱️ %s took %.1fms", stage, seconds * 1000)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block into rag_stage_seconds{stage=...}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
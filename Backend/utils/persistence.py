@@ -0,0 +1,27 @@
+import os
+import json
+
+
+def write_json_atomic(path, data):
+    """Write JSON so a crash leaves either the old file or the new one, never half of each"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_json(path, default):
+    """Load a JSON file written by write_json_atomic, falling back to `default`"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {path}: {str(e)}")
+        return default
@@ -1,8 +1,33 @@
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredPowerPointLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from utils.logger import get_logger
+# LangChain loaders and the text splitter are imported where they are used, so importing
+# this module (and starting the app) does not pay for them until the first upload
+
+# Parsing is CPU-bound, so files are loaded and split in worker processes (0 = inline)
+LOADER_PROCESSES = int(os.getenv("LOADER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+# Files at least this big are streamed page by page in the ingest thread instead of the pool.
+# A pooled file sends its whole chunk list back at once, so each one costs roughly its extracted
+# text plus chunk overlap in memory; at most LOADER_IN_FLIGHT of them are parsed or waiting at a time.
+STREAM_INGEST_BYTES = int(os.getenv("STREAM_INGEST_BYTES", str(8 * 1024 * 1024)))
+LOADER_IN_FLIGHT = 2 * LOADER_PROCESSES
+
+logger = get_logger("processFiles")
+
+_loader_pool = None
+_loader_pool_lock = threading.Lock()
 
 def load_and_split_files(file_paths):
+    from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredPowerPointLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     documents = []
 
     for path in file_paths:
@@ -22,3 +47,193 @@ def load_and_split_files(file_paths):
     # Split text into chunks
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
     return splitter.split_documents(documents)
+
+
+def get_loader(file_path):
+    """Pick the LangChain loader for a file based on its extension"""
+    ext = file_path.lower()
+    if ext.endswith(".pdf"):
+        from langchain_community.document_loaders import PyPDFLoader
+        logger.debug("📄 Loading PDF: %s", file_path)
+        return PyPDFLoader(file_path)
+    elif ext.endswith(".docx"):
+        from langchain_community.document_loaders import Docx2txtLoader
+        logger.debug("📄 Loading DOCX: %s", file_path)
+        return Docx2txtLoader(file_path)
+    elif ext.endswith(".pptx"):
+        from langchain_community.document_loaders import UnstructuredPowerPointLoader
+        logger.debug("📄 Loading PPTX: %s", file_path)
+        return UnstructuredPowerPointLoader(file_path)
+    elif ext.endswith(".txt"):
+        from langchain_community.document_loaders import TextLoader
+        logger.debug("📄 Loading TXT: %s", file_path)
+        return TextLoader(file_path)
+    return None
+
+
+def iter_file_chunks(loader, result):
+    """Yield chunks page by page, counting pages into result["pages"] as they stream in
+
+    Each page is split on its own, exactly as split_documents does for a full
+    list, so streaming yields the same chunks in the same order. Chunks record
+    their "start_index" in the page so overlapping hits can be merged at query time.
+    Parse and split time add up in result["load_seconds"] and result["split_seconds"],
+    since loader worker processes cannot record metrics themselves.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    pages = loader.lazy_load()
+    while True:
+        started = time.perf_counter()
+        page = next(pages, None)
+        result["load_seconds"] += time.perf_counter() - started
+        if page is None:
+            return
+        result["pages"] += 1
+        started = time.perf_counter()
+        chunks = splitter.split_documents([page])
+        result["split_seconds"] += time.perf_counter() - started
+        yield from chunks
+
+
+def load_and_split_file(file_path):
+    """Load and split a single file; runs in a loader worker process
+
+    Splitting only depends on the file's contents, so chunk order (and the
+    chunk ids derived from it) is the same no matter which worker ran it.
+    """
+    result = {"file_path": file_path, "pages": 0, "chunks": [], "error": None,
+              "unsupported": False, "streamed": False, "load_seconds": 0.0, "split_seconds": 0.0}
+    loader = get_loader(file_path)
+    if loader is None:
+        result["unsupported"] = True
+        return result
+
+    try:
+        result["chunks"] = list(iter_file_chunks(loader, result))
+    except Exception as e:
+        result["chunks"] = []
+        result["error"] = str(e)
+    return result
+
+
+def stream_file(file_path):
+    """Like load_and_split_file, but chunks are produced lazily in this process
+
+    Loader errors surface while iterating result["chunks"].
+    """
+    result = {"file_path": file_path, "pages": 0, "chunks": None, "error": None,
+              "unsupported": False, "streamed": True, "load_seconds": 0.0, "split_seconds": 0.0}
+    loader = get_loader(file_path)
+    if loader is None:
+        result["unsupported"] = True
+        return result
+    result["chunks"] = iter_file_chunks(loader, result)
+    return result
+
+
+def should_stream(file_path):
+    if LOADER_PROCESSES <= 0:
+        return True
+    try:
+        return os.path.getsize(file_path) >= STREAM_INGEST_BYTES
+    except OSError:
+        return False
+
+
+def get_loader_pool():
+    """Create the shared loader process pool on first use"""
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is None:
+            # spawn keeps workers clear of the parent's threads and model state
+            _loader_pool = ProcessPoolExecutor(
+                max_workers=LOADER_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _loader_pool
+
+
+def reset_loader_pool(broken_pool=None):
+    """Throw away a broken pool so the next batch starts fresh workers
+
+    With `broken_pool`, a pool that another job has already replaced is left alone.
+    """
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is not None and (broken_pool is None or _loader_pool is broken_pool):
+            _loader_pool.shutdown(wait=False, cancel_futures=True)
+            _loader_pool = None
+
+
+def shutdown_loader_pool():
+    reset_loader_pool()
+
+
+def failed_result(file_path, error):
+    return {"file_path": file_path, "pages": 0, "chunks": [], "error": error,
+            "unsupported": False, "streamed": False, "load_seconds": 0.0, "split_seconds": 0.0}
+
+
+def iter_loaded_files(file_paths):
+    """Yield load results: huge files streamed inline first, then pooled files as they finish
+
+    Pooled files are submitted LOADER_IN_FLIGHT at a time, and a result is
+    dropped once it has been yielded, so parsed chunks of a big batch never
+    pile up in the parent while earlier files are being embedded.
+
+    A worker that dies (a parser crash, the OOM killer) breaks the whole pool
+    and every file still queued on it fails with BrokenProcessPool. Those files
+    are retried one at a time on a fresh pool, so only the file that actually
+    kills its worker is reported as failed.
+    """
+    streamed = [file_path for file_path in file_paths if should_stream(file_path)]
+    queued = deque(file_path for file_path in file_paths if file_path not in streamed)
+
+    in_flight = {}
+    interrupted = []
+    pool = get_loader_pool() if queued else None
+
+    def submit_queued():
+        while queued and not interrupted and len(in_flight) < LOADER_IN_FLIGHT:
+            try:
+                future = pool.submit(load_and_split_file, queued[0])
+            except BrokenProcessPool:
+                return
+            in_flight[future] = queued.popleft()
+
+    submit_queued()
+    # Pooled files keep parsing in the background while the big ones stream
+    for file_path in streamed:
+        yield stream_file(file_path)
+
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            file_path = in_flight.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                interrupted.append(file_path)
+                continue
+            except Exception as e:
+                result = failed_result(file_path, str(e))
+            submit_queued()
+            yield result
+    if not interrupted and not queued:
+        return
+
+    reset_loader_pool(pool)
+    if interrupted:
+        logger.warning("⚠️ A loader worker died; retrying %d files one at a time", len(interrupted))
+    for file_path in interrupted:
+        pool = get_loader_pool()
+        try:
+            yield pool.submit(load_and_split_file, file_path).result()
+        except BrokenProcessPool as e:
+            # Alone on its own pool, so this is the file that kills the worker
+            reset_loader_pool(pool)
+            yield failed_result(file_path, f"Loader worker crashed: {e}")
+        except Exception as e:
+            yield failed_result(file_path, str(e))
+    # Files that were never submitted to the broken pool go through a fresh one as usual
+    yield from iter_loaded_files(list(queued))
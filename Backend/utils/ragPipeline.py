@@ -1,142 +1,1190 @@
 import os
-import requests
+import hashlib
+import threading
+import contextvars
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader, UnstructuredPowerPointLoader
-from langchain.schema import Document
+from langchain_core.documents import Document
+from utils.processFiles import iter_loaded_files
+from utils.embeddingCache import EmbeddingCache, embed_with_cache
+from utils.embeddingService import EmbeddingService, LazyEmbeddings
+from utils.llmClient import llm_client, LLM_MAX_CONCURRENCY
+from utils.answerCache import AnswerCache
+from utils.persistence import read_json
+from utils.collectionStats import CollectionStats
+from utils.lexicalIndex import LexicalIndex, reciprocal_rank_fusion
+from utils.reranker import rerank, get_reranker
+from utils.contextBuilder import build_context, count_tokens, get_tokenizer
+from utils.sharedState import SharedState, SHARED_STATE_PATH
+from utils.logger import get_logger
+from utils.metrics import span, observe_stage
 
 # Load API Key
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+logger = get_logger("ragPipeline")
+GROQ_MODEL = "llama3-8b-8192"
+
+# Embeddings; the model loads on first use (or on /warmup), not at import time
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+embedding_model = LazyEmbeddings(EMBEDDING_MODEL_NAME)
+
+# Chunks embedded and written to Chroma per step while ingesting a file
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Every embedding call (uploads and queries) is funnelled through one batching worker
+embedding_service = EmbeddingService(embedding_model)
+
+# On-disk cache so re-uploaded chunks skip the embedding model
+embedding_cache = EmbeddingCache()
+
+# Initialize ChromaDB; every session gets its own collection.
+# In-memory by default; CHROMA_PERSIST=1 keeps collections on disk under CHROMA_PATH across restarts.
+# CHROMA_HOST points every server worker at one shared Chroma server (implies persistence).
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_PERSIST = bool(CHROMA_HOST) or os.getenv("CHROMA_PERSIST", "").lower() in ("1", "true", "yes")
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_db")
+# Where earlier versions saved the whole file manifest as one JSON file; migrated on startup
+LEGACY_MANIFEST_PATH = os.path.join(CHROMA_PATH, "file_manifest.json")
+# A shared server has no single local manifest; each worker rebuilds its view with sync_session()
+PERSIST_MANIFEST = CHROMA_PERSIST and not CHROMA_HOST
+
+# Session tracking, job status and collection versions, shared by all worker processes
+shared_state = SharedState(
+    SHARED_STATE_PATH or os.path.join(CHROMA_PATH if CHROMA_PERSIST else "cache", "shared_state.sqlite3")
+)
+
+# Created by get_chroma_client() on first use
+chroma_client = None
+chroma_client_lock = threading.Lock()
+session_dbs = {}
+session_dbs_lock = threading.Lock()
+# Sessions whose collections exist on disk but have not been opened since startup
+persisted_sessions = set()
+
+# Session id -> {source id -> file hash and chunk ids}, so identical uploads are linked, not re-ingested.
+# With CHROMA_PERSIST each entry is also a row in shared_state, written on its own as files are stored
+file_manifest = {}
+manifest_lock = threading.Lock()
+
+# Cached answers are only valid for the collection version (write counter in shared_state) they were built on
+answer_cache = AnswerCache()
+
+# With a shared Chroma server other workers write too: session id -> the version this
+# process's manifest, stats and BM25 index reflect
+synced_versions = {}
+synced_versions_lock = threading.Lock()
+
+# Chunk counts per session and source file, so status checks never scan rows
+collection_stats = CollectionStats()
+
+# Session id -> BM25 index over that session's chunks, fused with vector search at query time
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# Default candidate pool handed to the cross-encoder when a request asks for reranking
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+lexical_indexes = {}
+lexical_indexes_lock = threading.Lock()
+# Session id -> lock held while its index is rebuilt from the collection
+lexical_build_locks = {}
+
+# LLM calls in flight at once for all /query/batch requests together; kept below the LLM client's
+# LLM_MAX_CONCURRENCY slots so a batch never starves interactive /query and /query/stream calls
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", str(max(1, LLM_MAX_CONCURRENCY // 2))))
+batch_llm_slots = threading.BoundedSemaphore(BATCH_LLM_CONCURRENCY)
+
+
+def collection_name_for(session_id):
+    return f"session_{session_id}"
+
+
+def get_chroma_client(create=True):
+    """Start the Chroma client on first use
+
+    With create=False an in-memory client that was never started is not
+    created just to find out it is empty; None is returned instead.
+    """
+    global chroma_client
+    with chroma_client_lock:
+        if chroma_client is None and (create or CHROMA_PERSIST):
+            import chromadb
+            started = time.perf_counter()
+            if CHROMA_HOST:
+                chroma_client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+            elif CHROMA_PERSIST:
+                chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+            else:
+                chroma_client = chromadb.EphemeralClient()
+            print(f"🗄️ Started ChromaDB client in {time.perf_counter() - started:.2f}s")
+        return chroma_client
+
+
+def reset_after_fork():
+    """Drop the Chroma client and stores a forked worker inherited from its parent
+
+    A client created before the fork (e.g. while restoring persisted sessions)
+    would share its HTTP connection pool or SQLite handles with every worker;
+    each worker opens its own on first use instead.
+    """
+    global chroma_client
+    with chroma_client_lock:
+        chroma_client = None
+    with session_dbs_lock:
+        if CHROMA_PERSIST:
+            # Collections opened in the parent still exist; reopen them lazily
+            persisted_sessions.update(session_dbs)
+        session_dbs.clear()
+
+
+def open_session_db_locked(session_id):
+    from langchain_chroma import Chroma
+    session_db = Chroma(
+        client=get_chroma_client(),
+        collection_name=collection_name_for(session_id),
+        embedding_function=embedding_model,
+    )
+    session_dbs[session_id] = session_db
+    persisted_sessions.discard(session_id)
+    return session_db
+
+
+def get_session_db(session_id):
+    """Return the Chroma store for a session, creating its collection on first use"""
+    with session_dbs_lock:
+        session_db = session_dbs.get(session_id)
+        if session_db is None:
+            if session_id not in persisted_sessions:
+                # A brand-new collection: its BM25 index can be built incrementally from empty
+                with lexical_indexes_lock:
+                    lexical_indexes.setdefault(session_id, LexicalIndex())
+            session_db = open_session_db_locked(session_id)
+        return session_db
+
+
+def find_session_db(session_id):
+    """Return the session's Chroma store if it has one, without creating it"""
+    with session_dbs_lock:
+        session_db = session_dbs.get(session_id)
+        if session_db is None and session_id in persisted_sessions:
+            # Opened lazily, so startup only lists collections instead of loading every index
+            session_db = open_session_db_locked(session_id)
+        return session_db
+
+
+def load_persisted_state():
+    """Register collections and the file manifest left on disk by a previous run
+
+    Returns the ids of sessions that still have a collection.
+    """
+    if not CHROMA_PERSIST:
+        return []
+    prefix = collection_name_for("")
+    names = [c.name if hasattr(c, "name") else c for c in get_chroma_client().list_collections()]
+    session_ids = [name[len(prefix):] for name in names if name.startswith(prefix)]
+    with session_dbs_lock:
+        persisted_sessions.update(session_ids)
+    if CHROMA_HOST:
+        # Manifests and counts are rebuilt per session from the server by sync_session()
+        print(f"💾 Found {len(session_ids)} session collections on {CHROMA_HOST}:{CHROMA_PORT}")
+        return session_ids
+    legacy = read_json(LEGACY_MANIFEST_PATH, None)
+    if legacy:
+        for session_id, entries in legacy.items():
+            for key, entry in entries.items():
+                shared_state.put_manifest_entry(session_id, entry.get("source_id") or key, entry)
+        os.remove(LEGACY_MANIFEST_PATH)
+    with manifest_lock:
+        saved = shared_state.manifest_entries()
+        for session_id in set(saved).difference(session_ids):
+            # Its collection is gone, so its chunks can never be linked again
+            shared_state.remove_manifest_session(session_id)
+        file_manifest.update({sid: entries for sid, entries in saved.items() if sid in session_ids})
+        collection_stats.load_manifest(file_manifest)
+    print(f"💾 Found {len(session_ids)} persisted session collections in {CHROMA_PATH}")
+    return session_ids
+
+
+def record_manifest_entry(session_id, file_hash, file_path, chunk_ids, source_name):
+    """Remember which chunks a source's current revision has; returns the entry it replaced, if any
+
+    Entries are keyed by source id, one per uploaded name. They are written
+    after the rows, so a crash only costs a re-ingest.
+    """
+    source_id = source_id_for(source_name)
+    with manifest_lock:
+        entries = file_manifest.setdefault(session_id, {})
+        previous = entries.get(source_id)
+        entries[source_id] = {
+            "source": file_path, "source_name": source_name, "source_id": source_id,
+            "file_hash": file_hash, "chunk_ids": list(chunk_ids)
+        }
+        if PERSIST_MANIFEST:
+            shared_state.put_manifest_entry(session_id, source_id, entries[source_id])
+    return previous
+
+
+def forget_manifest_entry(session_id, source_id):
+    with manifest_lock:
+        previous = file_manifest.get(session_id, {}).pop(source_id, None)
+        if previous is not None and PERSIST_MANIFEST:
+            shared_state.remove_manifest_entry(session_id, source_id)
+    return previous
+
+
+def entry_file_hash(key, entry):
+    # Manifests written before entries were keyed by source used the file hash as the key
+    return entry.get("file_hash", key)
+
+
+def collection_version(session_id):
+    return shared_state.collection_version(session_id)
+
+
+def bump_collection_version(session_id):
+    """Record a write to a session's collection and drop answers built on the old contents"""
+    with synced_versions_lock:
+        previous = synced_versions.get(session_id)
+        version = shared_state.bump_collection_version(session_id)
+        # Our own write keeps this process in sync unless another worker wrote in between
+        if previous is not None and version == previous + 1:
+            synced_versions[session_id] = version
+    answer_cache.invalidate(session_id)
+
+
+def sync_session(session_id):
+    """Reload a session's manifest, counts and BM25 index if another worker changed its collection
+
+    Only needed with a shared Chroma server (CHROMA_HOST); otherwise this
+    process made every write itself and its view is always current.
+    """
+    if not CHROMA_HOST:
+        return
+    # Read the version before the rows so a concurrent write is picked up on the next call
+    version = shared_state.collection_version(session_id)
+    with synced_versions_lock:
+        if synced_versions.get(session_id) == version:
+            return
 
-# Embeddings
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    try:
+        collection = get_chroma_client().get_collection(collection_name_for(session_id))
+    except Exception:
+        collection = None
+
+    entries = {}
+    if collection is not None:
+        offset = 0
+        while True:
+            rows = collection.get(include=["metadatas"], limit=1000, offset=offset)
+            if not rows["ids"]:
+                break
+            for chunk_id, metadata in zip(rows["ids"], rows["metadatas"]):
+                metadata = metadata or {}
+                key = metadata.get("source_id") or metadata.get("file_hash", "")
+                entry = entries.setdefault(key, {
+                    "source": metadata.get("source", ""), "source_name": metadata.get("source_name"),
+                    "source_id": metadata.get("source_id"), "file_hash": metadata.get("file_hash", ""),
+                    "chunk_ids": []
+                })
+                entry["chunk_ids"].append(chunk_id)
+            offset += len(rows["ids"])
+
+    with session_dbs_lock:
+        if collection is None:
+            session_dbs.pop(session_id, None)
+            persisted_sessions.discard(session_id)
+        elif session_id not in session_dbs:
+            persisted_sessions.add(session_id)
+        with manifest_lock:
+            if entries:
+                file_manifest[session_id] = entries
+            else:
+                file_manifest.pop(session_id, None)
+        collection_stats.drop_session(session_id)
+        collection_stats.load_manifest({session_id: entries})
+        with lexical_indexes_lock:
+            # Rebuilt from the collection on the next hybrid search
+            lexical_indexes.pop(session_id, None)
+    with synced_versions_lock:
+        synced_versions[session_id] = version
+    answer_cache.invalidate(session_id)
+
+
+def get_lexical_index(session_id, session_db=None):
+    """Return the session's BM25 index, rebuilding it from stored chunks after a restart
+
+    The rebuilt index is only published once it is complete, so concurrent
+    searches never see a partial one; they wait for the single rebuild instead.
+    """
+    with lexical_indexes_lock:
+        index = lexical_indexes.get(session_id)
+        if index is not None or session_db is None:
+            return index
+        build_lock = lexical_build_locks.setdefault(session_id, threading.Lock())
+
+    with build_lock:
+        with lexical_indexes_lock:
+            index = lexical_indexes.get(session_id)
+        if index is not None:
+            # Built by the thread we were waiting on
+            return index
+
+        # Only reached for collections opened from disk: one paged pass over the stored text
+        version = collection_version(session_id)
+        index = LexicalIndex()
+        offset = 0
+        while True:
+            rows = session_db._collection.get(include=["documents"], limit=1000, offset=offset)
+            if not rows["ids"]:
+                break
+            index.add(rows["ids"], rows["documents"])
+            offset += len(rows["ids"])
+
+        if collection_version(session_id) != version:
+            # A write landed mid-scan and may be missing; use this index once and rebuild next time
+            return index
+        with lexical_indexes_lock:
+            lexical_indexes[session_id] = index
+    logger.info("🔤 Rebuilt lexical index for session %s (%d chunks)", session_id, len(index))
+    return index
+
+
+def index_chunks_lexically(session_id, chunk_ids, texts):
+    """Add new chunks to the session's BM25 index if it is loaded
+
+    An index that is not loaded yet is rebuilt from the collection, new rows
+    included, the first time it is searched.
+    """
+    with lexical_indexes_lock:
+        index = lexical_indexes.get(session_id)
+    if index is not None:
+        index.add(chunk_ids, texts)
+
+
+def find_indexed_file(file_hash, prefer_session_id=None):
+    """Locate a session that already stored this file; returns (session_id, manifest entry) or None
+
+    The session `prefer_session_id` is searched first.
+    """
+    with manifest_lock:
+        sessions = sorted(file_manifest.items(), key=lambda item: item[0] != prefer_session_id)
+        for session_id, entries in sessions:
+            for key, entry in entries.items():
+                if entry_file_hash(key, entry) == file_hash:
+                    return session_id, entry
+    return None
+
+
+def drop_session_collection(session_id):
+    """Drop a session's collection and manifest; other sessions are untouched"""
+    with session_dbs_lock:
+        session_dbs.pop(session_id, None)
+        persisted_sessions.discard(session_id)
+        with manifest_lock:
+            if file_manifest.pop(session_id, None) is not None and PERSIST_MANIFEST:
+                shared_state.remove_manifest_session(session_id)
+        collection_stats.drop_session(session_id)
+        with lexical_indexes_lock:
+            lexical_indexes.pop(session_id, None)
+            lexical_build_locks.pop(session_id, None)
+        bump_collection_version(session_id)
+        try:
+            get_chroma_client(create=False).delete_collection(collection_name_for(session_id))
+            print(f"🗑️ Dropped ChromaDB collection for session {session_id}")
+            return True
+        except Exception:
+            # Collection was never created (no uploads) or is already gone
+            return False
+
+# Groq calls go through the shared pooled client
+def call_groq_llama(prompt):
+    try:
+        return llm_client.chat([{"role": "user", "content": prompt}], GROQ_MODEL, temperature=0.7)
+    except Exception as e:
+        logger.error("🔥 Groq API Error: %s", e)
+        raise e
 
-# Initialize ChromaDB (in-memory, no persistence)
-db = Chroma(embedding_function=embedding_model)
 
-# Manual call to Groq API
-def call_groq_llama(prompt):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "model": "llama3-8b-8192",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.7
-    }
+def stream_groq_llama(prompt):
+    """Yield completion tokens as the chat completions endpoint streams them back"""
+    return llm_client.stream_chat([{"role": "user", "content": prompt}], GROQ_MODEL, temperature=0.7)
 
+
+async def acall_groq_llama(prompt):
     try:
-        response = requests.post(url, headers=headers, json=body)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as e:
-        print(f"🔥 Groq API HTTP Error: {e}")
-        print(f"🔥 Response content: {response.text}")
-        raise e
+        return await llm_client.achat([{"role": "user", "content": prompt}], GROQ_MODEL, temperature=0.7)
     except Exception as e:
-        print(f"🔥 Groq API Error: {e}")
+        logger.error("🔥 Groq API Error: %s", e)
         raise e
 
 
-def store_embeddings(file_paths):
-    print(f"🔍 store_embeddings called with {len(file_paths)} file paths: {file_paths}")
-    documents = []
+def astream_groq_llama(prompt):
+    """Async generator of completion tokens"""
+    return llm_client.astream_chat([{"role": "user", "content": prompt}], GROQ_MODEL, temperature=0.7)
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def report_progress(progress, file_path, stage, **details):
+    """Forward a per-file stage update to the caller's progress callback, if any"""
+    if progress is None:
+        return
+    try:
+        progress(file_path, stage, **details)
+    except Exception as e:
+        logger.warning("⚠️ Progress callback failed for %s: %s", file_path, e)
+
+
+def source_id_for(source_name):
+    """Identity of a document within a session; a later upload under the same name is a new revision of it"""
+    return hashlib.sha256(source_name.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def stored_chunk_ids(session_db, source_id):
+    """Ids of the chunks currently stored for a source; reads ids only, no text or vectors"""
+    chunk_ids = set()
+    offset = 0
+    while True:
+        rows = session_db._collection.get(where={"source_id": source_id}, include=[], limit=1000, offset=offset)
+        if not rows["ids"]:
+            return chunk_ids
+        chunk_ids.update(rows["ids"])
+        offset += len(rows["ids"])
+
+
+def release_upload(session_id, file_path):
+    """Forget an upload that a newer one replaced, freeing its disk space and session quota
+
+    Only files tracked as uploads of the session are deleted.
+    """
+    if shared_state.remove_session_file(session_id, file_path) is None:
+        return
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+    logger.info("🗑️ Removed superseded upload %s", file_path)
+
+
+def complete_revision(session_db, session_id, file_path, file_hash, source_name, chunk_ids, stale_ids):
+    """Make `chunk_ids` the current revision of a source once its rows are stored
+
+    Deletes the chunks the revision no longer has, records it in the manifest
+    and counts, and drops the upload of the revision it replaced. Returns the
+    number of chunks deleted.
+    """
+    source_id = source_id_for(source_name)
+    stale_ids = list(stale_ids)
+    for batch in iter_batches(stale_ids, INGEST_BATCH_SIZE):
+        session_db._collection.delete(ids=batch)
+    if stale_ids:
+        index = get_lexical_index(session_id)
+        if index is not None:
+            index.remove(stale_ids)
+
+    if chunk_ids:
+        previous = record_manifest_entry(session_id, file_hash, file_path, chunk_ids, source_name)
+        collection_stats.set_file_count(session_id, source_id, source_name, len(chunk_ids), file_hash)
+    else:
+        # A revision without any text leaves nothing to search
+        previous = forget_manifest_entry(session_id, source_id)
+        collection_stats.remove_file(session_id, source_id)
+    if previous is not None and previous["source"] != file_path:
+        release_upload(session_id, previous["source"])
+    bump_collection_version(session_id)
+    return len(stale_ids)
+
+
+def link_indexed_file(session_id, file_hash, file_path, source_name=None):
+    """Reuse chunks of an identical file that is already indexed; returns the chunk count or None
+
+    An identical file under another name, in this session or another one, is
+    copied under this file's name so it is a source of its own; no parsing or
+    embedding is needed.
+    """
+    source_name = source_name or os.path.basename(file_path)
+    source_id = source_id_for(source_name)
+    with manifest_lock:
+        current = file_manifest.get(session_id, {}).get(source_id)
+    if current is not None and current.get("file_hash") == file_hash:
+        if current["source"] != file_path:
+            # Same name and same bytes: the new upload adds nothing
+            logger.info("♻️ %s is identical to %s, reusing %d chunks", file_path, current["source"], len(current["chunk_ids"]))
+            release_upload(session_id, file_path)
+        return len(current["chunk_ids"])
+
+    found = find_indexed_file(file_hash, prefer_session_id=session_id)
+    if found is None:
+        return None
+    source_session_id, entry = found
+    source_db = find_session_db(source_session_id)
+    if source_db is None:
+        return None
+
+    # Copy the stored vectors instead of parsing and embedding again
+    rows = source_db._collection.get(
+        ids=entry["chunk_ids"], include=["embeddings", "documents", "metadatas"]
+    )
+    if len(rows["ids"]) != len(entry["chunk_ids"]):
+        return None
+    # Re-key the copies under this file's name so its next revision finds them
+    chunk_ids = [f"{source_id}:{chunk_id.split(':', 1)[-1]}" for chunk_id in rows["ids"]]
+    metadatas = [
+        {**(metadata or {}), "source": file_path, "source_id": source_id, "source_name": source_name,
+         "file_hash": file_hash}
+        for metadata in rows["metadatas"]
+    ]
+    session_db = get_session_db(session_id)
+    previous_ids = stored_chunk_ids(session_db, source_id)
+    session_db._collection.upsert(
+        ids=chunk_ids,
+        embeddings=rows["embeddings"],
+        documents=rows["documents"],
+        metadatas=metadatas,
+    )
+    index_chunks_lexically(session_id, chunk_ids, rows["documents"])
+    complete_revision(session_db, session_id, file_path, file_hash, source_name, chunk_ids,
+                      previous_ids.difference(chunk_ids))
+    logger.info("♻️ %s is identical to %s in session %s, copied %d chunks",
+                file_path, entry.get("source_name") or entry["source"], source_session_id, len(chunk_ids))
+    return len(chunk_ids)
+
+
+def iter_batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def store_chunks_in_batches(session_db, session_id, file_path, file_hash, source_name, result, progress):
+    """Embed and upsert a file's chunks INGEST_BATCH_SIZE at a time; returns the stored chunk ids
+
+    Chunk ids are "<source id>:<text fingerprint>:<occurrence>", so a new
+    revision of a source reproduces the ids of every chunk whose text did not
+    change. Those keep their vectors and only get their metadata refreshed;
+    just the new chunks are embedded, and complete_revision() deletes the ids
+    the revision no longer has. result["chunks_embedded"] and
+    result["chunks_removed"] record how big the diff was.
+
+    Chunks may be a lazy generator, so peak memory depends on the batch size and
+    not on the document. If the file fails part way, the rows it added are removed.
+    """
+    source_id = source_id_for(source_name)
+    previous_ids = stored_chunk_ids(session_db, source_id)
+    occurrences = {}
+    chunk_ids = []
+    added_ids = []
+    try:
+        for batch in iter_batches(result["chunks"], INGEST_BATCH_SIZE):
+            texts = [chunk.page_content for chunk in batch]
+            batch_ids = []
+            for chunk, text in zip(batch, texts):
+                fingerprint = chunk_fingerprint(text)
+                # Repeated text (headers, blank pages) is numbered so every id stays unique
+                occurrence = occurrences.get(fingerprint, 0)
+                occurrences[fingerprint] = occurrence + 1
+                batch_ids.append(f"{source_id}:{fingerprint}:{occurrence}")
+                chunk.metadata.update(file_hash=file_hash, source_id=source_id,
+                                      source_name=source_name, chunk_hash=fingerprint)
+            metadatas = [chunk.metadata for chunk in batch]
+            new = [i for i, chunk_id in enumerate(batch_ids) if chunk_id not in previous_ids]
+            kept = [i for i, chunk_id in enumerate(batch_ids) if chunk_id in previous_ids]
+
+            if new:
+                new_ids = [batch_ids[i] for i in new]
+                new_texts = [texts[i] for i in new]
+                with span("embed"):
+                    embeddings = embed_with_cache(embedding_cache, embedding_service, EMBEDDING_MODEL_NAME, new_texts)
+                with span("vector_add"):
+                    session_db._collection.upsert(
+                        ids=new_ids,
+                        embeddings=embeddings,
+                        documents=new_texts,
+                        metadatas=[metadatas[i] for i in new],
+                    )
+                    index_chunks_lexically(session_id, new_ids, new_texts)
+                added_ids.extend(new_ids)
+            if kept:
+                # Unchanged text keeps its vector; page numbers, offsets and the file path may have moved
+                with span("vector_add"):
+                    session_db._collection.update(
+                        ids=[batch_ids[i] for i in kept], metadatas=[metadatas[i] for i in kept]
+                    )
+            chunk_ids.extend(batch_ids)
+            bump_collection_version(session_id)
+            report_progress(progress, file_path, "storing", pages=result["pages"],
+                            chunks_embedded=len(added_ids), chunks_reused=len(chunk_ids) - len(added_ids),
+                            chunks_stored=len(chunk_ids))
+    except Exception:
+        # The previous revision stays current; its reused rows were only re-labelled
+        if added_ids:
+            session_db._collection.delete(ids=added_ids)
+            index = get_lexical_index(session_id)
+            if index is not None:
+                index.remove(added_ids)
+            bump_collection_version(session_id)
+        raise
+
+    result["chunks_embedded"] = len(added_ids)
+    result["chunks_removed"] = complete_revision(
+        session_db, session_id, file_path, file_hash, source_name, chunk_ids, previous_ids.difference(chunk_ids)
+    )
+    return chunk_ids
+
+
+def record_load_and_split(result):
+    observe_stage("load", result["load_seconds"])
+    observe_stage("split", result["split_seconds"])
+
+
+def store_embeddings(file_paths, session_id, progress=None, file_hashes=None, source_names=None):
+    """Load, split, embed and store each file in the session's collection, reporting every stage through `progress`
+
+    `file_hashes` maps a path to its SHA-256 when the caller already computed it
+    while saving the upload; files that are already indexed are linked instead.
+    `source_names` maps a path to the name it was uploaded under (its base name
+    otherwise): a file with the name of one already in the session replaces it,
+    and only the chunks that changed between the two are embedded or deleted.
+    Loading and splitting run on the loader process pool (huge files stream
+    page by page instead) and files are stored in the order they finish.
+    """
+    logger.debug("🔍 store_embeddings called with %d file paths: %s", len(file_paths), file_paths)
+    sync_session(session_id)
+    session_db = get_session_db(session_id)
+    file_hashes = dict(file_hashes or {})
+    source_names = {path: (source_names or {}).get(path) or os.path.basename(path) for path in file_paths}
+    stored_any = False
+
+    to_load = []
     for file_path in file_paths:
-        print(f"📄 Processing file: {file_path}")
-        ext = file_path.lower()
-        if ext.endswith(".pdf"):
-            print(f"📄 Loading PDF: {file_path}")
-            loader = PyPDFLoader(file_path)
-        elif ext.endswith(".docx"):
-            print(f"📄 Loading DOCX: {file_path}")
-            loader = Docx2txtLoader(file_path)
-        elif ext.endswith(".pptx"):
-            print(f"📄 Loading PPTX: {file_path}")
-            loader = UnstructuredPowerPointLoader(file_path)
-        elif ext.endswith(".txt"):
-            print(f"📄 Loading TXT: {file_path}")
-            loader = TextLoader(file_path)
-        else:
-            print(f"⚠️ Unsupported file type: {file_path}")
+        logger.debug("📄 Processing file: %s", file_path)
+        file_hash = file_hashes.get(file_path) or hash_file(file_path)
+        file_hashes[file_path] = file_hash
+        try:
+            linked_chunks = link_indexed_file(session_id, file_hash, file_path, source_names[file_path])
+        except Exception as e:
+            logger.warning("⚠️ Could not reuse existing chunks for %s: %s", file_path, e)
+            linked_chunks = None
+        if linked_chunks is not None:
+            report_progress(progress, file_path, "deduplicated", chunks=linked_chunks)
+            stored_any = True
+            continue
+        to_load.append(file_path)
+
+    for result in iter_loaded_files(to_load):
+        file_path = result["file_path"]
+        file_hash = file_hashes[file_path]
+        if result["unsupported"]:
+            logger.warning("⚠️ Unsupported file type: %s", file_path)
+            report_progress(progress, file_path, "skipped", error="Unsupported file type")
             continue
+        if result["error"] is not None:
+            logger.error("❌ Error loading %s: %s", file_path, result["error"])
+            report_progress(progress, file_path, "failed", error=result["error"])
+            continue
+
+        if not result["streamed"]:
+            record_load_and_split(result)
+            logger.debug("✅ Loaded %d documents from %s", result["pages"], file_path)
+            report_progress(progress, file_path, "loaded", pages=result["pages"])
+            logger.debug("✂️ Split %s into %d chunks", file_path, len(result["chunks"]))
+            report_progress(progress, file_path, "chunked", chunks=len(result["chunks"]))
 
+        # An identical file in this batch may have finished first
         try:
-            docs = loader.load()
-            print(f"✅ Loaded {len(docs)} documents from {file_path}")
-            documents.extend(docs)
+            linked_chunks = link_indexed_file(session_id, file_hash, file_path, source_names[file_path])
         except Exception as e:
-            print(f"❌ Error loading {file_path}: {str(e)}")
+            logger.warning("⚠️ Could not reuse existing chunks for %s: %s", file_path, e)
+            linked_chunks = None
+        if linked_chunks is not None:
+            report_progress(progress, file_path, "deduplicated", chunks=linked_chunks)
+            stored_any = True
             continue
 
-    print(f"📚 Total documents loaded: {len(documents)}")
-    if not documents:
-        print("❌ No documents to process")
-        return False
+        try:
+            chunk_ids = store_chunks_in_batches(
+                session_db, session_id, file_path, file_hash, source_names[file_path], result, progress
+            )
+        except Exception as e:
+            logger.error("❌ Error storing %s to ChromaDB: %s", file_path, e)
+            report_progress(progress, file_path, "failed", error=str(e))
+            continue
+        finally:
+            # Streamed files are parsed while their chunks are stored
+            if result["streamed"]:
+                record_load_and_split(result)
+        if not chunk_ids:
+            report_progress(progress, file_path, "chunked", pages=result["pages"], chunks=0)
+            continue
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    chunks = splitter.split_documents(documents)
-    print(f"✂️ Split into {len(chunks)} chunks")
+        logger.info("✅ Stored %d chunks from %d pages of %s (%d embedded, %d stale removed)", len(chunk_ids),
+                    result["pages"], file_path, result["chunks_embedded"], result["chunks_removed"])
+        report_progress(progress, file_path, "stored", pages=result["pages"], chunks=len(chunk_ids),
+                        chunks_embedded=result["chunks_embedded"], chunks_removed=result["chunks_removed"])
+        stored_any = True
 
-    try:
-        db.add_documents(chunks)
-        print(f"✅ Successfully stored {len(chunks)} chunks to ChromaDB")
-        return True
-    except Exception as e:
-        print(f"❌ Error storing to ChromaDB: {str(e)}")
-        return False
+    if not stored_any:
+        logger.warning("❌ No documents to process")
+    return stored_any
 
 
-def process_with_rag_pipeline(file_paths):
+def process_with_rag_pipeline(file_paths, session_id, progress=None, file_hashes=None, source_names=None):
     try:
-        return store_embeddings(file_paths)
+        return store_embeddings(file_paths, session_id, progress=progress, file_hashes=file_hashes,
+                                source_names=source_names)
     except Exception as e:
-        print("❌ Failed in RAG pipeline:", str(e))
+        logger.exception("❌ Failed in RAG pipeline: %s", e)
         return False
 
 
-def query_with_rag(query):
-    # Retrieve relevant documents
-    docs = db.similarity_search(query, k=3)
+def retrieve_documents(query, session_id, k=3, query_vector=None):
+    """Retrieve the most relevant chunks from this session's collection only
+
+    With HYBRID_SEARCH on, vector and BM25 rankings over HYBRID_CANDIDATES are
+    fused with reciprocal rank fusion so exact identifiers are not missed.
+    Returned documents carry their "chunk_id", "distance" (None for lexical-only
+    hits) and "score" in metadata.
+    """
+    query_vectors = None if query_vector is None else [query_vector]
+    return retrieve_documents_batch([query], session_id, k, query_vectors)[0]
+
+
+def retrieve_documents_batch(queries, session_id, k=3, query_vectors=None):
+    """retrieve_documents for several queries with one multi-query vector search
+
+    Returns one list of documents per query, in order.
+    """
+    session_db = find_session_db(session_id)
+    if session_db is None:
+        return [[] for _ in queries]
+    if query_vectors is None:
+        query_vectors = embedding_service.embed_queries(queries)
+
+    n_results = max(k, HYBRID_CANDIDATES) if HYBRID_SEARCH else k
+    results = session_db._collection.query(
+        query_embeddings=list(query_vectors), n_results=n_results,
+        include=["documents", "metadatas", "distances"]
+    )
+    lexical_index = get_lexical_index(session_id, session_db) if HYBRID_SEARCH else None
+
+    doc_lists = []
+    for position, query in enumerate(queries):
+        rows = {
+            chunk_id: (text, metadata, distance)
+            for chunk_id, text, metadata, distance in zip(
+                results["ids"][position], results["documents"][position],
+                results["metadatas"][position], results["distances"][position]
+            )
+        }
+        vector_ranking = list(results["ids"][position])
+
+        if HYBRID_SEARCH:
+            lexical_hits = lexical_index.search(query, n_results)
+            fused = reciprocal_rank_fusion(vector_ranking, [chunk_id for chunk_id, _ in lexical_hits])[:k]
+
+            # Lexical-only hits still need their text and metadata from the store
+            missing = [chunk_id for chunk_id, _ in fused if chunk_id not in rows]
+            if missing:
+                extra = session_db._collection.get(ids=missing, include=["documents", "metadatas"])
+                for chunk_id, text, metadata in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+                    rows[chunk_id] = (text, metadata, None)
+            ranked = [(chunk_id, score) for chunk_id, score in fused if chunk_id in rows]
+        else:
+            ranked = [(chunk_id, None) for chunk_id in vector_ranking[:k]]
+
+        docs = []
+        for chunk_id, score in ranked:
+            text, metadata, distance = rows[chunk_id]
+            docs.append(Document(
+                page_content=text,
+                metadata={**(metadata or {}), "chunk_id": chunk_id, "distance": distance, "score": score}
+            ))
+        doc_lists.append(docs)
+    return doc_lists
+
+
+def prepare_query(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Embed the query, retrieve its context and check the answer cache
+
+    With use_rerank, `candidates` chunks are fetched and the cross-encoder keeps
+    the best k. Returns (docs, cached_answer, cache_store, info) where
+    cache_store(answer) saves a freshly generated answer for this exact query
+    and context, and info holds retrieval details such as rerank_ms.
+    """
+    return prepare_queries([query], session_id, k, use_rerank, candidates)[0]
+
+
+def prepare_queries(queries, session_id, k=3, use_rerank=False, candidates=None):
+    """prepare_query for a list of queries: one embedding pass and one vector search for all of them"""
+    sync_session(session_id)
+    # Read the version before searching so a concurrent write can't be cached under it
+    version = collection_version(session_id)
+    with span("query_embed"):
+        query_vectors = embedding_service.embed_queries(queries)
+    if use_rerank:
+        candidates = max(candidates or RERANK_CANDIDATES, k)
+    with span("search"):
+        doc_lists = retrieve_documents_batch(
+            queries, session_id, k=candidates if use_rerank else k, query_vectors=query_vectors
+        )
+
+    prepared = []
+    for query, query_vector, docs in zip(queries, query_vectors, doc_lists):
+        info = {"k": k, "rerank": use_rerank}
+        if use_rerank:
+            with span("rerank"):
+                docs, info["rerank_ms"] = rerank(query, docs, k)
+            info["candidates"] = candidates
+        prepared.append(check_answer_cache(session_id, version, query, query_vector, docs, info))
+    return prepared
+
+
+def check_answer_cache(session_id, version, query, query_vector, docs, info):
+    if not docs:
+        return docs, None, lambda answer: None, info
+
+    chunk_ids = [doc.metadata["chunk_id"] for doc in docs]
+    cached = answer_cache.lookup(session_id, version, query, query_vector, chunk_ids)
+
+    def cache_store(answer, stats=None):
+        answer_cache.store(session_id, version, query, query_vector, chunk_ids, answer, stats)
+
+    return docs, cached, cache_store, info
+
+
+# Metadata a /search request may filter on -> the Chroma metadata key it matches
+SEARCH_FILTER_KEYS = {"source": "source_name", "page": "page", "file_hash": "file_hash"}
+SEARCH_FILTER_OPERATORS = {"in": "$in", "gte": "$gte", "lte": "$lte", "gt": "$gt", "lt": "$lt"}
+
+
+def build_search_filter(filters):
+    """Turn {"source": ..., "page": ...} filters into a Chroma where clause
+
+    A value is matched exactly, a list matches any of its items and a dict such
+    as {"gte": 3, "lt": 8} compares. Raises ValueError for anything else.
+    """
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    clauses = []
+    for name, value in filters.items():
+        key = SEARCH_FILTER_KEYS.get(name)
+        if key is None:
+            raise ValueError(f"Unknown filter {name!r}; expected one of {', '.join(SEARCH_FILTER_KEYS)}")
+        if isinstance(value, list):
+            if not value:
+                raise ValueError(f"Filter {name!r} has an empty list")
+            clauses.append({key: {"$in": value}})
+        elif isinstance(value, dict):
+            for operator, operand in value.items():
+                if operator not in SEARCH_FILTER_OPERATORS:
+                    raise ValueError(f"Unknown operator {operator!r} in filter {name!r}")
+                clauses.append({key: {SEARCH_FILTER_OPERATORS[operator]: operand}})
+        elif isinstance(value, (str, int, float, bool)):
+            clauses.append({key: value})
+        else:
+            raise ValueError(f"Unsupported value for filter {name!r}")
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def search_chunks(query, session_id, limit=10, offset=0, filters=None):
+    """Retrieval only: one page of the chunks closest to the query, with scores and no LLM call
+
+    Returns {"results": [...], "offset", "limit", "has_more"}. Each result has
+    the chunk's text, vector "distance" (lower is closer), relevance "score",
+    source name, page and start/end offsets within the page.
+    """
+    where = build_search_filter(filters)
+    page = {"results": [], "offset": offset, "limit": limit, "has_more": False}
+    sync_session(session_id)
+    session_db = find_session_db(session_id)
+    if session_db is None:
+        return page
+
+    with span("query_embed"):
+        query_vector = embedding_service.embed_query(query)
+    with span("search"):
+        # One extra row tells whether another page exists
+        results = session_db._collection.query(
+            query_embeddings=[query_vector], n_results=offset + limit + 1, where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+    try:
+        relevance = session_db._select_relevance_score_fn()
+    except ValueError:
+        relevance = None
+
+    rows = list(zip(results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]))
+    page["has_more"] = len(rows) > offset + limit
+    for chunk_id, text, metadata, distance in rows[offset:offset + limit]:
+        metadata = metadata or {}
+        start_index = metadata.get("start_index")
+        page["results"].append({
+            "chunk_id": chunk_id,
+            "text": text,
+            "distance": distance,
+            "score": relevance(distance) if relevance is not None else None,
+            "source": metadata.get("source_name") or os.path.basename(metadata.get("source", "")),
+            "page": metadata.get("page"),
+            "start_index": start_index,
+            "end_index": start_index + len(text) if start_index is not None else None,
+            "file_hash": metadata.get("file_hash"),
+        })
+    return page
+
+
+def build_prompt(query, docs):
+    """Assemble the prompt from the token-budgeted context; returns (prompt, context stats)"""
+    with span("prompt_build"):
+        context, context_info = build_context(docs)
+        prompt = f"Use the following documents to answer the question:\n\n{context}\n\nQuestion: {query}"
+        context_info["prompt_tokens"] = count_tokens(prompt)
+    logger.debug("🧾 Prompt uses %d tokens (%d passages)", context_info["prompt_tokens"], context_info["passages_used"])
+    return prompt, context_info
+
+
+def describe_sources(docs):
+    """Summarize retrieved chunks for the client before the answer arrives"""
+    return [
+        {
+            "source": doc.metadata.get("source_name") or os.path.basename(doc.metadata.get("source", "")),
+            "page": doc.metadata.get("page"),
+            "snippet": doc.page_content[:200]
+        }
+        for doc in docs
+    ]
+
+
+NO_DOCUMENTS_ANSWER = "📂 Please upload documents so I can answer your question."
+
+
+def plan_answer(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Everything before the LLM call, shared by the sync and async query paths
+
+    Returns (result, prompt, cache_store). When prompt is None, result already
+    holds the final answer (no documents, or a cached answer); otherwise the
+    caller sends prompt to the LLM, adds the answer to result and passes it to
+    cache_store.
+    """
+    return plan_prepared_answer(query, prepare_query(query, session_id, k, use_rerank, candidates))
+
+
+def plan_prepared_answer(query, prepared):
+    docs, cached, cache_store, info = prepared
     if not docs:
-        return "📂 Please upload documents so I can answer your question."
+        return {"answer": NO_DOCUMENTS_ANSWER, **info}, None, cache_store
+    if cached is not None:
+        logger.debug("⚡ Answer cache hit")
+        answer, context_info = cached
+        return {"answer": answer, "cached": True, **info, **context_info}, None, cache_store
+
+    prompt, context_info = build_prompt(query, docs)
+    info.update(context_info)
+    return info, prompt, lambda answer: cache_store(answer, context_info)
+
+
+def answer_query(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Answer a question from the session's documents; returns the answer plus retrieval details"""
+    result, prompt, cache_store = plan_answer(query, session_id, k, use_rerank, candidates)
+    if prompt is None:
+        return result
+
+    try:
+        with span("llm"):
+            response = call_groq_llama(prompt).strip()
+        cache_store(response)
+        return {"answer": response, **result}
+    except Exception as e:
+        return {"answer": f"❌ Error calling Groq API: {str(e)}", **result}
+
 
-    # Construct context
-    context = "\n\n".join([doc.page_content for doc in docs])
-    prompt = f"Use the following documents to answer the question:\n\n{context}\n\nQuestion: {query}"
+def answer_queries(queries, session_id, k=3, use_rerank=False, candidates=None, concurrency=BATCH_LLM_CONCURRENCY):
+    """Answer a list of questions, yielding (index, result) as each one finishes
 
+    All queries are embedded in one pass and searched with one multi-query
+    call; LLM calls then run on at most `concurrency` threads and share the
+    BATCH_LLM_CONCURRENCY slots with every other batch. A question that fails
+    yields {"error": ...} and the others carry on.
+    """
     try:
-        response = call_groq_llama(prompt)
-        return response.strip()
+        prepared = prepare_queries(queries, session_id, k, use_rerank, candidates)
     except Exception as e:
-        return f"❌ Error calling Groq API: {str(e)}"
+        logger.error("🔥 Batch retrieval failed: %s", e)
+        for index in range(len(queries)):
+            yield index, {"error": str(e)}
+        return
 
+    pending = []
+    for index, (query, item) in enumerate(zip(queries, prepared)):
+        try:
+            result, prompt, cache_store = plan_prepared_answer(query, item)
+        except Exception as e:
+            yield index, {"error": str(e)}
+            continue
+        if prompt is None:
+            yield index, result
+        else:
+            pending.append((index, result, prompt, cache_store))
+    if not pending:
+        return
 
+    def generate(result, prompt, cache_store):
+        with batch_llm_slots, span("llm"):
+            response = call_groq_llama(prompt).strip()
+        cache_store(response)
+        return {"answer": response, **result}
 
+    pool = ThreadPoolExecutor(max_workers=min(concurrency, len(pending)), thread_name_prefix="batch-llm")
+    try:
+        # Each call gets a copy of the request context so its log lines keep the trace id
+        futures = {
+            pool.submit(contextvars.copy_context().run, generate, result, prompt, cache_store): index
+            for index, result, prompt, cache_store in pending
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], {"error": f"❌ Error calling Groq API: {str(e)}"}
+    finally:
+        # A client that disconnects stops the questions that have not started yet
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def query_with_rag(query, session_id):
+    return answer_query(query, session_id)["answer"]
+
+
+def plan_stream(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Retrieval half of the streaming path, shared by the sync and async streams
+
+    Returns (events, prompt, context_info, cache_store): events are the
+    (event, data) pairs to send before any answer tokens. When prompt is None
+    those events already complete the stream.
+    """
+    docs, cached, cache_store, info = prepare_query(query, session_id, k, use_rerank, candidates)
+    events = [("sources", {"sources": describe_sources(docs), **info})]
+    if not docs:
+        events += [("token", {"token": NO_DOCUMENTS_ANSWER}), ("done", {})]
+        return events, None, None, cache_store
+    if cached is not None:
+        answer, context_info = cached
+        events += [("token", {"token": answer}), ("done", {"cached": True, **context_info})]
+        return events, None, None, cache_store
 
+    prompt, context_info = build_prompt(query, docs)
+    return events, prompt, context_info, lambda answer: cache_store(answer, context_info)
 
 
-def check_if_chromadb_empty():
-    collection = db.get()
-    print(f"Total documents in ChromaDB: {len(collection['ids'])}")
-    if (len(collection["ids"]) == 0):
+def stream_query_with_rag(query, session_id, k=3, use_rerank=False, candidates=None):
+    """Yield (event, data) pairs: the retrieved sources first, then answer tokens as they arrive"""
+    events, prompt, context_info, cache_store = plan_stream(query, session_id, k, use_rerank, candidates)
+    yield from events
+    if prompt is None:
+        return
+
+    try:
+        tokens = []
+        with span("llm_stream"):
+            for token in stream_groq_llama(prompt):
+                tokens.append(token)
+                yield "token", {"token": token}
+        cache_store("".join(tokens).strip())
+        yield "done", context_info
+    except Exception as e:
+        logger.error("🔥 Groq API streaming error: %s", e)
+        yield "error", {"error": f"❌ Error calling Groq API: {str(e)}"}
+
+
+def check_if_chromadb_empty(session_id):
+    sync_session(session_id)
+    total = collection_stats.session_total(session_id)
+    logger.debug("Total documents in ChromaDB for session %s: %d", session_id, total)
+    if (total == 0):
         return 0
     else:
         return 1
 
+def get_chromadb_stats(session_id=None):
+    """Document counts from the stats layer; O(1) in the number of stored chunks"""
+    stats = collection_stats.totals()
+    if session_id is not None:
+        sync_session(session_id)
+        stats["session"] = collection_stats.session_stats(session_id)
+    return stats
+
+def warm_up(include_reranker=False):
+    """Load the models and start the vector store ahead of the first request
+
+    Safe to call more than once; returns how long each component took.
+    """
+    steps = [
+        ("embedding_model", lambda: embedding_service.embed_query("warmup")),
+        ("vector_store", get_chroma_client),
+        ("tokenizer", get_tokenizer),
+    ]
+    if include_reranker:
+        steps.append(("reranker", get_reranker))
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - started, 3)
+    print(f"🔥 Warmed up: {timings}")
+    return timings
+
+
+def readiness():
+    """Which heavy components are loaded; ready once queries will not pay a cold start"""
+    components = {
+        "embedding_model": embedding_model.loaded,
+        "vector_store": chroma_client is not None,
+    }
+    return {"ready": all(components.values()), **components}
+
+
 def clear_chromadb():
-    """Clear all documents from ChromaDB"""
+    """Clear all documents from ChromaDB by dropping every session collection"""
     try:
-        # Get all document IDs
-        collection = db.get()
-        if collection['ids']:
-            # Delete all documents
-            db.delete(ids=collection['ids'])
-            print(f"🗑️ Cleared {len(collection['ids'])} documents from ChromaDB")
+        with session_dbs_lock:
+            session_dbs.clear()
+            collection_stats.reset()
+            with lexical_indexes_lock:
+                lexical_indexes.clear()
+            persisted_sessions.clear()
+            with manifest_lock:
+                file_manifest.clear()
+                if PERSIST_MANIFEST:
+                    shared_state.clear_manifest()
+            answer_cache.clear()
+            client = get_chroma_client(create=False)
+            names = [c.name if hasattr(c, "name") else c for c in client.list_collections()] if client else []
+            prefix = collection_name_for("")
+            for name in names:
+                client.delete_collection(name)
+                if name.startswith(prefix):
+                    # Tells other workers that share the server to drop their view of it
+                    bump_collection_version(name[len(prefix):])
+        if names:
+            print(f"🗑️ Dropped {len(names)} collections from ChromaDB")
         else:
             print("🗑️ ChromaDB is already empty")
         return True
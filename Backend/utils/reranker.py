@@ -0,0 +1,53 @@
+import os
+import time
+import threading
+import importlib.util
+
+# Optional cross-encoder rerank stage; the model only loads the first time it is used
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+
+RERANKER_UNAVAILABLE = "Reranker unavailable: sentence-transformers is not installed"
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+class RerankerUnavailable(RuntimeError):
+    pass
+
+
+def reranker_available():
+    """Whether the cross-encoder can be loaded, checked without importing it"""
+    return _reranker is not None or importlib.util.find_spec("sentence_transformers") is not None
+
+
+def get_reranker():
+    """Load the cross-encoder on CPU once and keep it resident"""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise RerankerUnavailable(RERANKER_UNAVAILABLE) from e
+            started = time.perf_counter()
+            _reranker = CrossEncoder(RERANK_MODEL_NAME, device="cpu")
+            print(f"🧮 Loaded reranker {RERANK_MODEL_NAME} in {time.perf_counter() - started:.2f}s")
+        return _reranker
+
+
+def rerank(query, docs, top_k):
+    """Rescore candidate chunks against the query; returns (top_k docs, elapsed ms)
+
+    The elapsed time includes loading the model when this is its first use.
+    """
+    if not docs:
+        return docs, 0.0
+    started = time.perf_counter()
+    model = get_reranker()
+    scores = model.predict([(query, doc.page_content) for doc in docs], batch_size=RERANK_BATCH_SIZE)
+    for doc, score in zip(docs, scores):
+        doc.metadata["rerank_score"] = float(score)
+    ranked = sorted(docs, key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+    return ranked[:top_k], (time.perf_counter() - started) * 1000
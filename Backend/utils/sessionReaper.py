@@ -0,0 +1,167 @@
+import os
+import time
+import heapq
+import threading
+
+# Expired sessions are deleted by a background thread, a few at a time, instead of
+# scanning every session inside /upload
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "8"))
+REAPER_BATCH_PAUSE = float(os.getenv("REAPER_BATCH_PAUSE", "0.05"))  # Seconds between batches
+REAPER_RESYNC_SECONDS = float(os.getenv("REAPER_RESYNC_SECONDS", "300"))
+
+
+class SessionReaper:
+    """Deletes sessions once they have been idle for `timeout` seconds
+
+    Expiry times sit in a min-heap, so each wake-up only looks at sessions that
+    are actually due. Activity updates just move the deadline in a dict; stale
+    heap entries are re-pushed when they surface. Before reaping, the session's
+    last activity is re-read through `last_activity`, which sees touches made by
+    other worker processes. `reap(session_id)` deletes the session and returns
+    (files deleted, bytes freed).
+    """
+
+    def __init__(self, timeout, reap, last_activity, all_sessions):
+        self.timeout = timeout
+        self._reap = reap
+        self._last_activity = last_activity
+        self._all_sessions = all_sessions
+        self._heap = []        # (deadline, session id), may hold stale deadlines
+        self._deadlines = {}   # session id -> current deadline
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._thread_pid = None
+        self._next_resync = time.time() + REAPER_RESYNC_SECONDS
+
+        self.sessions_reaped = 0
+        self.files_deleted = 0
+        self.bytes_freed = 0
+        self.errors = 0
+        self.runs = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+
+    def schedule(self, session_id, last_activity=None):
+        """Record activity for a session, pushing its expiry back"""
+        deadline = (time.time() if last_activity is None else last_activity) + self.timeout
+        with self._wakeup:
+            known = session_id in self._deadlines
+            self._deadlines[session_id] = max(deadline, self._deadlines.get(session_id, 0))
+            if not known:
+                earliest = self._heap[0][0] if self._heap else None
+                heapq.heappush(self._heap, (deadline, session_id))
+                if earliest is None or deadline < earliest:
+                    self._wakeup.notify()
+
+    def load(self, activity):
+        """Schedule every session in a {session id: last activity} mapping"""
+        for session_id, last_activity in activity.items():
+            self.schedule(session_id, last_activity)
+
+    def forget(self, session_id):
+        """Stop tracking a session that was removed some other way"""
+        with self._wakeup:
+            self._deadlines.pop(session_id, None)
+
+    def start(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+        print(f"⏲️ Session reaper started (timeout {self.timeout}s)")
+
+    def _due_batch(self):
+        """Wait until sessions are due, then pop up to REAPER_BATCH_SIZE of them"""
+        with self._wakeup:
+            while True:
+                now = time.time()
+                if now >= self._next_resync:
+                    return None
+                if self._heap and self._heap[0][0] <= now:
+                    break
+                wait_until = self._next_resync
+                if self._heap:
+                    wait_until = min(wait_until, self._heap[0][0])
+                self._wakeup.wait(wait_until - now)
+
+            batch = []
+            while self._heap and self._heap[0][0] <= now and len(batch) < REAPER_BATCH_SIZE:
+                _, session_id = heapq.heappop(self._heap)
+                deadline = self._deadlines.get(session_id)
+                if deadline is None:
+                    continue  # Forgotten
+                if deadline > now:
+                    heapq.heappush(self._heap, (deadline, session_id))
+                    continue
+                batch.append(session_id)
+            return batch
+
+    def _resync(self):
+        """Pick up sessions that only other worker processes have seen"""
+        self._next_resync = time.time() + REAPER_RESYNC_SECONDS
+        try:
+            self.load(self._all_sessions())
+        except Exception as e:
+            print(f"⚠️ Session reaper could not resync: {str(e)}")
+
+    def _run(self):
+        while True:
+            batch = self._due_batch()
+            if batch is None:
+                self._resync()
+                continue
+            if batch:
+                self._reap_batch(batch)
+                time.sleep(REAPER_BATCH_PAUSE)
+
+    def _reap_batch(self, batch):
+        start = time.perf_counter()
+        for session_id in batch:
+            try:
+                last_activity = self._last_activity(session_id)
+                if last_activity is None:
+                    # Already removed, e.g. by another worker's reaper or /session/clear
+                    self.forget(session_id)
+                    continue
+                if last_activity + self.timeout > time.time():
+                    with self._wakeup:
+                        self._deadlines.pop(session_id, None)
+                    self.schedule(session_id, last_activity)
+                    continue
+
+                print(f"🕐 Reaping inactive session: {session_id}")
+                files, freed = self._reap(session_id)
+                self.forget(session_id)
+                with self._wakeup:
+                    self.sessions_reaped += 1
+                    self.files_deleted += files
+                    self.bytes_freed += freed
+            except Exception as e:
+                print(f"❌ Session reaper failed on {session_id}: {str(e)}")
+                with self._wakeup:
+                    self.errors += 1
+                # Try again after another timeout rather than spinning on it
+                self.forget(session_id)
+                self.schedule(session_id)
+        with self._wakeup:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_run_seconds = round(time.perf_counter() - start, 4)
+
+    def stats(self):
+        with self._wakeup:
+            next_deadline = min(self._deadlines.values()) if self._deadlines else None
+            return {
+                "timeout_seconds": self.timeout,
+                "tracked_sessions": len(self._deadlines),
+                "next_expiry_in_seconds": round(max(next_deadline - time.time(), 0), 1) if next_deadline else None,
+                "sessions_reaped": self.sessions_reaped,
+                "files_deleted": self.files_deleted,
+                "bytes_freed": self.bytes_freed,
+                "errors": self.errors,
+                "runs": self.runs,
+                "last_run_at": self.last_run_at,
+                "last_run_seconds": self.last_run_seconds,
+            }
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Session tracking, ingestion job status, collection versions and the file manifest live in
+# SQLite so every server worker process sees the same state
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+
+
+class SharedState:
+    """Cross-process store for state that used to live in per-process dicts
+
+    Every process opens its own connection (re-opened after a fork), and WAL
+    mode lets readers and a writer work at the same time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn_pid = None
+        self._conn_handle = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " last_activity REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS session_files ("
+                " session_id TEXT NOT NULL,"
+                " position INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " info TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS session_files_session ON session_files (session_id);"
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " finished_at REAL);"
+                "CREATE TABLE IF NOT EXISTS collection_versions ("
+                " session_id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS manifest_entries ("
+                " session_id TEXT NOT NULL,"
+                " source_id TEXT NOT NULL,"
+                " entry TEXT NOT NULL,"
+                " PRIMARY KEY (session_id, source_id));"
+            )
+            self._conn.commit()
+
+    @property
+    def _conn(self):
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._conn_pid != os.getpid():
+            self._conn_handle = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn_handle.execute("PRAGMA journal_mode=WAL")
+            self._conn_handle.execute("PRAGMA synchronous=NORMAL")
+            self._conn_pid = os.getpid()
+        return self._conn_handle
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Sessions
+
+    def touch_session(self, session_id, when=None):
+        self._execute(
+            "INSERT INTO sessions (session_id, last_activity) VALUES (?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET last_activity = excluded.last_activity",
+            (session_id, time.time() if when is None else when)
+        )
+
+    def ensure_session(self, session_id):
+        """Register a session without resetting the activity time of one that exists"""
+        self._execute(
+            "INSERT OR IGNORE INTO sessions (session_id, last_activity) VALUES (?, ?)",
+            (session_id, time.time())
+        )
+
+    def session_activity(self):
+        """Return {session id: last activity time} for every tracked session"""
+        return dict(self._query("SELECT session_id, last_activity FROM sessions"))
+
+    def last_activity(self, session_id):
+        """Return a session's last activity time, or None if it is not tracked"""
+        rows = self._query("SELECT last_activity FROM sessions WHERE session_id = ?", (session_id,))
+        return rows[0][0] if rows else None
+
+    def add_session_file(self, session_id, info):
+        self._execute(
+            "INSERT INTO session_files (session_id, info) VALUES (?, ?)",
+            (session_id, json.dumps(info))
+        )
+
+    def session_file_list(self, session_id):
+        rows = self._query(
+            "SELECT info FROM session_files WHERE session_id = ? ORDER BY position", (session_id,)
+        )
+        return [json.loads(info) for (info,) in rows]
+
+    def remove_session_file(self, session_id, saved_path):
+        """Forget one upload of a session; returns its info, or None if it was not tracked"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, info FROM session_files WHERE session_id = ?", (session_id,)
+            ).fetchall()
+            for position, info in rows:
+                info = json.loads(info)
+                if info.get("saved_path") == saved_path:
+                    self._conn.execute("DELETE FROM session_files WHERE position = ?", (position,))
+                    self._conn.commit()
+                    return info
+        return None
+
+    def session_ids(self):
+        rows = self._query("SELECT session_id FROM sessions UNION SELECT session_id FROM session_files")
+        return [session_id for (session_id,) in rows]
+
+    def remove_session(self, session_id):
+        """Forget a session; returns True if it was tracked"""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+            removed += self._conn.execute("DELETE FROM session_files WHERE session_id = ?", (session_id,)).rowcount
+            self._conn.commit()
+        return removed > 0
+
+    def clear_sessions(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.execute("DELETE FROM session_files")
+            self._conn.commit()
+
+    # Ingestion jobs
+
+    def save_job(self, job):
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, finished_at) VALUES (?, ?, ?)",
+            (job["job_id"], json.dumps(job), job.get("finished_at"))
+        )
+
+    def load_job(self, job_id):
+        rows = self._query("SELECT data FROM jobs WHERE job_id = ?", (job_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def prune_jobs(self, finished_before):
+        self._execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,))
+
+    # Collection versions
+
+    def collection_version(self, session_id):
+        rows = self._query("SELECT version FROM collection_versions WHERE session_id = ?", (session_id,))
+        return rows[0][0] if rows else 0
+
+    def bump_collection_version(self, session_id):
+        """Increment and return the session's write counter"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collection_versions (session_id, version) VALUES (?, 1) "
+                "ON CONFLICT(session_id) DO UPDATE SET version = version + 1",
+                (session_id,)
+            )
+            version = self._conn.execute(
+                "SELECT version FROM collection_versions WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.commit()
+        return version
+
+    # File manifest: one row per stored source, so recording a file never rewrites the others
+
+    def put_manifest_entry(self, session_id, source_id, entry):
+        self._execute(
+            "INSERT OR REPLACE INTO manifest_entries (session_id, source_id, entry) VALUES (?, ?, ?)",
+            (session_id, source_id, json.dumps(entry))
+        )
+
+    def remove_manifest_entry(self, session_id, source_id):
+        self._execute(
+            "DELETE FROM manifest_entries WHERE session_id = ? AND source_id = ?", (session_id, source_id)
+        )
+
+    def remove_manifest_session(self, session_id):
+        self._execute("DELETE FROM manifest_entries WHERE session_id = ?", (session_id,))
+
+    def clear_manifest(self):
+        self._execute("DELETE FROM manifest_entries")
+
+    def manifest_entries(self):
+        """Return {session id: {source id: entry}} for every stored source"""
+        manifest = {}
+        for session_id, source_id, entry in self._query("SELECT session_id, source_id, entry FROM manifest_entries"):
+            manifest.setdefault(session_id, {})[source_id] = json.loads(entry)
+        return manifest
@@ -0,0 +1,95 @@
+import os
+import time
+import hashlib
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+# Uploads are parsed straight off the request stream: each file part is written once,
+# to its final path, in UPLOAD_CHUNK_SIZE reads, so memory stays flat whatever the size
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(512 * 1024 * 1024)))
+MAX_FILE_BYTES = int(os.getenv("MAX_FILE_BYTES", str(256 * 1024 * 1024)))
+MAX_SESSION_BYTES = int(os.getenv("MAX_SESSION_BYTES", str(1024 * 1024 * 1024)))
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """A file or the session went over its byte quota; answered with 413"""
+
+    def __init__(self, message):
+        super().__init__(description=message)
+
+
+def receive_files(stream, boundary, field_name, target_path, max_file_bytes=MAX_FILE_BYTES,
+                  max_total_bytes=MAX_SESSION_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Write every `field_name` file part of a multipart body to disk while it arrives
+
+    `target_path(filename)` picks where a part is written. Each part is hashed
+    and counted on the way in; parts with an empty filename and other form
+    fields are skipped. Going over `max_file_bytes` for one file or
+    `max_total_bytes` for the whole request raises UploadTooLarge as soon as the
+    limit is crossed, and every file written by this request is removed.
+
+    Returns a list of dicts with "original_name", "saved_path", "content_type",
+    "file_hash", "size" and "upload_time".
+    """
+    # The decoder buffers at most one read plus a partial boundary; nothing else is held in memory
+    decoder = MultipartDecoder(boundary.encode("latin-1"), max_form_memory_size=2 * chunk_size)
+    saved = []
+    written_paths = []
+    current = None  # The file part being written: {"info", "handle", "digest"}
+    total = 0
+
+    try:
+        while True:
+            data = stream.read(chunk_size)
+            # An empty read ends the body; None tells the decoder no more data is coming
+            decoder.receive_data(data or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File) and event.name == field_name and event.filename:
+                    path = target_path(event.filename)
+                    current = {
+                        "info": {"original_name": event.filename, "saved_path": path,
+                                 "content_type": event.headers.get("Content-Type"), "size": 0},
+                        "handle": open(path, "wb"),
+                        "digest": hashlib.sha256(),
+                    }
+                    written_paths.append(path)
+                elif isinstance(event, (Field, File)):
+                    current = None  # Not an upload we keep; its data is dropped
+                elif isinstance(event, Data) and current is not None:
+                    info = current["info"]
+                    info["size"] += len(event.data)
+                    total += len(event.data)
+                    if info["size"] > max_file_bytes:
+                        raise UploadTooLarge(f"{info['original_name']} is larger than the {max_file_bytes} byte file limit")
+                    if total > max_total_bytes:
+                        raise UploadTooLarge(f"Upload exceeds the session's remaining {max_total_bytes} byte quota")
+                    current["handle"].write(event.data)
+                    current["digest"].update(event.data)
+                    if not event.more_data:
+                        current["handle"].close()
+                        info["file_hash"] = current["digest"].hexdigest()
+                        info["upload_time"] = time.time()
+                        saved.append(info)
+                        current = None
+                event = decoder.next_event()
+            if isinstance(event, Epilogue) or not data:
+                break
+    except BaseException:
+        if current is not None:
+            current["handle"].close()
+        for path in written_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+    if current is not None:
+        # The body ended in the middle of a file part
+        current["handle"].close()
+        for path in written_paths:
+            os.remove(path)
+        raise ValueError("Upload ended before the file was complete")
+    return saved